@@ -104,7 +104,6 @@ def create_alert(
             new_appointment_time, datetime.now().isoformat(), expiry_time, int(auto_notify)
         ))
         conn.commit()
-        conn.close()
         
         logger.info(f"Created alert {alert_id} for appointment {appointment_id}")
         
@@ -115,7 +114,6 @@ def create_alert(
             cursor = conn.cursor()
             cursor.execute("SELECT patient_email FROM appointments WHERE appointment_id = ?", (appointment_id,))
             patient_email = cursor.fetchone()[0] if cursor.rowcount > 0 else None
-            conn.close()
 
             # Example notification calls (can be expanded based on channels)
             if patient_email:
@@ -188,7 +186,6 @@ def update_alert(
         
         cursor.execute(f"UPDATE alerts SET {", ".join(updates)}, updated_at = ? WHERE alert_id = ?", params)
         conn.commit()
-        conn.close()
         
         if cursor.rowcount == 0:
             return json.dumps({"success": False, "error": f"Alert {alert_id} not found"})
@@ -271,8 +268,6 @@ def get_alerts(
         for row in cursor.fetchall():
             alerts.append(dict(row))
         
-        conn.close()
-        
         return json.dumps({
             "success": True,
             "alerts": alerts,
@@ -311,7 +306,6 @@ def notify_patient(
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM alerts WHERE alert_id = ?", (alert_id,))
         alert = cursor.fetchone()
-        conn.close()
 
         if not alert:
             return json.dumps({"success": False, "error": f"Alert {alert_id} not found"})
@@ -327,7 +321,6 @@ def notify_patient(
         appointment_info = cursor.fetchone()
         patient_email = appointment_info["patient_email"] if appointment_info else None
         patient_name = appointment_info["patient_name"] if appointment_info else "Patient"
-        conn.close()
 
         results = {}
         if "email" in notification_channels and patient_email:
@@ -389,7 +382,6 @@ def notify_doctor(
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM alerts WHERE alert_id = ?", (alert_id,))
         alert = cursor.fetchone()
-        conn.close()
 
         if not alert:
             return json.dumps({"success": False, "error": f"Alert {alert_id} not found"})
@@ -405,7 +397,6 @@ def notify_doctor(
         doctor_info = cursor.fetchone()
         doctor_email = doctor_info["email"] if doctor_info else None
         doctor_phone = doctor_info["phone"] if doctor_info else None
-        conn.close()
 
         results = {}
         if "email" in notification_channels and doctor_email:
@@ -459,7 +450,6 @@ def acknowledge_alert(
             WHERE alert_id = ?
         """, (AlertStatus.ACKNOWLEDGED.value, acknowledged_by, acknowledgment_note, datetime.now().isoformat(), alert_id))
         conn.commit()
-        conn.close()
         
         if cursor.rowcount == 0:
             return json.dumps({"success": False, "error": f"Alert {alert_id} not found"})
@@ -506,7 +496,6 @@ def create_bulk_alerts(
             cursor = conn.cursor()
             cursor.execute("SELECT patient_phone, doctor_name FROM appointments WHERE appointment_id = ?", (appt_id,))
             appointment_info = cursor.fetchone()
-            conn.close()
 
             if appointment_info:
                 patient_phone = appointment_info["patient_phone"]
@@ -557,8 +546,6 @@ def get_alert_statistics() -> Dict[str, Any]:
     cursor.execute("SELECT alert_type, COUNT(*) FROM alerts GROUP BY alert_type")
     alerts_by_type = {row[0]: row[1] for row in cursor.fetchall()}
 
-    conn.close()
-
     return {
         "total_alerts": total_alerts,
         "alerts_by_status": alerts_by_status,
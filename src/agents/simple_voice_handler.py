@@ -8,8 +8,53 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
+# Prefer google-re2 (linear-time matching, no catastrophic backtracking) when available
+try:
+    import re2 as re
+except ImportError:
+    import re
+
 logger = logging.getLogger(__name__)
 
+# Patterns used by extract_appointment_info, compiled once at import time
+_NAME_RES = [
+    re.compile(r"for ([A-Za-z\s]+)"),
+    re.compile(r"my name is ([A-Za-z\s]+)"),
+    re.compile(r"i am ([A-Za-z\s]+)"),
+    re.compile(r"patient ([A-Za-z\s]+)"),
+    re.compile(r"appointment for ([A-Za-z\s]+)")  # Added pattern for form-generated text
+]
+_FORM_PHONE_RE = re.compile(r"phone:\s*([+\-\(\)\s\d]+)\)")
+_PHONE_RE = re.compile(r"(\+?\d{1,3}[-.\s]?)?\(?(\d{3})\)?[-.\s]?(\d{3})[-.\s]?(\d{4})")
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_DEPARTMENT_RE = re.compile(r" in ([a-z]+) department")
+_DATE_RE = re.compile(r"on (\d{4}-\d{2}-\d{2})")
+_FORM_REASON_RE = re.compile(r"reason:\s*(.+?)(?:\s*$|\s*\.|$)")
+_REASON_RES = [
+    re.compile(r"for (.+?)(?:\s+on\s+|\s+at\s+|\s+with\s+|$)"),
+    re.compile(r"because (.+?)(?:\s+on\s+|\s+at\s+|\s+with\s+|$)")
+]
+
+_DEPARTMENT_KEYWORDS = {
+    "cardiology": ["cardiology", "cardiologist", "heart", "cardiac"],
+    "dermatology": ["dermatology", "dermatologist", "skin"],
+    "general": ["general", "gp", "family doctor"],
+    "orthopedics": ["orthopedics", "orthopedist", "bone", "joint"],
+    "pediatrics": ["pediatrics", "pediatrician", "child", "kids"],
+    "neurology": ["neurology", "neurologist", "brain", "nerve"]
+}
+
+_DATE_KEYWORDS = {
+    "today": 0,
+    "tomorrow": 1,
+    "next week": 7,
+    "monday": "monday",
+    "tuesday": "tuesday",
+    "wednesday": "wednesday",
+    "thursday": "thursday",
+    "friday": "friday"
+}
+
 async def handle_voice_request(transcript: str) -> Dict[str, Any]:
     """
     Handle voice request with simple natural language processing
@@ -134,17 +179,8 @@ def extract_appointment_info(user_input: str) -> Dict[str, Any]:
     info = {}
     
     # Extract patient name (look for patterns like "for John" or "my name is Sarah")
-    name_patterns = [
-        r"for ([A-Za-z\s]+)",
-        r"my name is ([A-Za-z\s]+)",
-        r"i am ([A-Za-z\s]+)",
-        r"patient ([A-Za-z\s]+)",
-        r"appointment for ([A-Za-z\s]+)"  # Added pattern for form-generated text
-    ]
-    
-    import re
-    for pattern in name_patterns:
-        match = re.search(pattern, user_input_lower)
+    for name_re in _NAME_RES:
+        match = name_re.search(user_input_lower)
         if match:
             name = match.group(1).strip()
             # Clean up name by removing "(phone:" part if present
@@ -154,71 +190,44 @@ def extract_appointment_info(user_input: str) -> Dict[str, Any]:
             break
     
     # Extract phone number
-    phone_pattern = r"phone:\s*([+\-\(\)\s\d]+)\)"
-    phone_match = re.search(phone_pattern, user_input)
+    phone_match = _FORM_PHONE_RE.search(user_input)
     if phone_match:
         info["patient_phone"] = phone_match.group(1).strip()
     else:
         # Fallback pattern for standalone phone numbers
-        phone_pattern = r"(\+?\d{1,3}[-.\s]?)?\(?(\d{3})\)?[-.\s]?(\d{3})[-.\s]?(\d{4})"
-        phone_match = re.search(phone_pattern, user_input)
+        phone_match = _PHONE_RE.search(user_input)
         if phone_match:
             info["patient_phone"] = phone_match.group(0)
     
     # Extract email
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    email_match = re.search(email_pattern, user_input)
+    email_match = _EMAIL_RE.search(user_input)
     if email_match:
         info["patient_email"] = email_match.group(0)
-        info["patient_email"] = email_match.group(0)
     
     # Extract department/specialization - improved for form-generated text
-    departments = {
-        "cardiology": ["cardiology", "cardiologist", "heart", "cardiac"],
-        "dermatology": ["dermatology", "dermatologist", "skin"],
-        "general": ["general", "gp", "family doctor"],
-        "orthopedics": ["orthopedics", "orthopedist", "bone", "joint"],
-        "pediatrics": ["pediatrics", "pediatrician", "child", "kids"],
-        "neurology": ["neurology", "neurologist", "brain", "nerve"]
-    }
-    
     # First try to find " in [department] department" pattern from form
-    dept_pattern = r" in ([a-z]+) department"
-    dept_match = re.search(dept_pattern, user_input_lower)
+    dept_match = _DEPARTMENT_RE.search(user_input_lower)
     if dept_match:
         dept_name = dept_match.group(1).strip()
-        if dept_name in departments:
+        if dept_name in _DEPARTMENT_KEYWORDS:
             info["department_preference"] = dept_name
     else:
         # Fallback to keyword matching
-        for dept, keywords in departments.items():
+        for dept, keywords in _DEPARTMENT_KEYWORDS.items():
             if any(keyword in user_input_lower for keyword in keywords):
                 info["department_preference"] = dept
                 break
     
     # Extract date patterns - improved for form dates
     # First try to match YYYY-MM-DD format from form
-    date_pattern = r"on (\d{4}-\d{2}-\d{2})"
-    date_match = re.search(date_pattern, user_input)
+    date_match = _DATE_RE.search(user_input)
     if date_match:
         info["preferred_date"] = date_match.group(1)
     else:
         # Fallback to natural language date keywords
-        date_keywords = {
-            "today": 0,
-            "tomorrow": 1,
-            "next week": 7,
-            "monday": "monday",
-            "tuesday": "tuesday", 
-            "wednesday": "wednesday",
-            "thursday": "thursday",
-            "friday": "friday"
-        }
-        
-        for date_word, offset in date_keywords.items():
+        for date_word, offset in _DATE_KEYWORDS.items():
             if date_word in user_input_lower:
                 if isinstance(offset, int):
-                    from datetime import datetime, timedelta
                     target_date = datetime.now() + timedelta(days=offset)
                     info["preferred_date"] = target_date.strftime("%Y-%m-%d")
                 else:
@@ -227,21 +236,15 @@ def extract_appointment_info(user_input: str) -> Dict[str, Any]:
     
     # Extract reason/notes - improved for form text
     # First try to match "Reason: [text]" pattern from form
-    reason_pattern = r"reason:\s*(.+?)(?:\s*$|\s*\.|$)"
-    reason_match = re.search(reason_pattern, user_input_lower)
+    reason_match = _FORM_REASON_RE.search(user_input_lower)
     if reason_match:
         reason = reason_match.group(1).strip()
         if len(reason) > 2:  # Only use substantial reasons
             info["reason"] = reason.title()
     else:
         # Fallback to other patterns
-        reason_patterns = [
-            r"for (.+?)(?:\s+on\s+|\s+at\s+|\s+with\s+|$)",
-            r"because (.+?)(?:\s+on\s+|\s+at\s+|\s+with\s+|$)"
-        ]
-        
-        for pattern in reason_patterns:
-            match = re.search(pattern, user_input_lower)
+        for reason_re in _REASON_RES:
+            match = reason_re.search(user_input_lower)
             if match:
                 reason = match.group(1).strip()
                 if len(reason) > 5:  # Only use substantial reasons
@@ -365,5 +368,3 @@ def handle_voice_request_sync(transcript: str) -> Dict[str, Any]:
             "response": "I apologize, but I'm having trouble processing your request right now. Please try again or contact our reception desk for assistance.",
             "error": str(e)
         }
-
-    return info
@@ -6,15 +6,19 @@ import os
 import json
 from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, jsonify, session
-from flask_socketio import SocketIO, emit, join_room, leave_room
 import asyncio
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List
 
-# Import our agents
-from src.agents.langchain_mcp_agent import get_hospital_agent
+if TYPE_CHECKING:
+    from flask_socketio import SocketIO
 
 doctor_dashboard = Blueprint("doctor_dashboard", __name__)
 
+async def _get_agent():
+    """Import and return the hospital agent on first use (keeps LangChain/MCP off the import path)"""
+    from src.agents.langchain_mcp_agent import get_hospital_agent
+    return await get_hospital_agent()
+
 @doctor_dashboard.route("/doctor/dashboard")
 def dashboard():
     """Main doctor dashboard page"""
@@ -31,7 +35,7 @@ async def get_doctor_schedule_route():
         if not doctor_name:
             return jsonify({"success": False, "error": "Doctor name not provided"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Get schedule for doctor {doctor_name} from {start_date} to {end_date}",
             {"action": "get_doctor_schedule", "doctor_name": doctor_name, "start_date": start_date, "end_date": end_date}
@@ -51,7 +55,7 @@ async def get_today_schedule_route():
         if not doctor_name:
             return jsonify({"success": False, "error": "Doctor name not provided"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Get today's schedule for doctor {doctor_name} on {today}",
             {"action": "get_doctor_today_schedule", "doctor_name": doctor_name, "date": today}
@@ -71,7 +75,7 @@ async def create_alert_route():
         if not alert_info:
             return jsonify({"success": False, "error": "Missing alert_info"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Create a new alert with details: {json.dumps(alert_info)}",
             {"action": "create_dynamic_alert", "alert_info": alert_info}
@@ -91,7 +95,7 @@ async def update_appointment_status_route():
         if not status_info:
             return jsonify({"success": False, "error": "Missing status_info"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Update appointment status with details: {json.dumps(status_info)}",
             {"action": "update_appointment_status", "status_info": status_info}
@@ -111,7 +115,7 @@ async def report_running_late_route():
         if not late_info:
             return jsonify({"success": False, "error": "Missing late_info"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Report doctor running late with details: {json.dumps(late_info)}",
             {"action": "report_doctor_running_late", "late_info": late_info}
@@ -133,7 +137,7 @@ async def emergency_reschedule_route():
         if not reschedule_info:
             return jsonify({"success": False, "error": "Missing reschedule_info"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Handle emergency reschedule with details: {json.dumps(reschedule_info)}",
             {"action": "emergency_reschedule", "reschedule_info": reschedule_info}
@@ -152,7 +156,7 @@ async def get_patient_history_route():
         if not patient_phone:
             return jsonify({"success": False, "error": "Patient phone number is required"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Get patient history for phone number {patient_phone}",
             {"action": "get_patient_history", "patient_phone": patient_phone}
@@ -173,7 +177,7 @@ async def get_doctor_analytics_route():
         if not doctor_name:
             return jsonify({"success": False, "error": "Doctor name not provided"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Get analytics for doctor {doctor_name}",
             {"action": "get_doctor_analytics", "doctor_name": doctor_name}
@@ -195,7 +199,7 @@ async def update_availability_route():
         if not availability_info:
             return jsonify({"success": False, "error": "Missing availability_info"}), 400
 
-        agent = await get_hospital_agent()
+        agent = await _get_agent()
         result = await agent.process_request(
             f"Update doctor availability with details: {json.dumps(availability_info)}",
             {"action": "update_doctor_availability", "availability_info": availability_info}
@@ -209,6 +213,8 @@ def init_doctor_socketio_events(socketio_instance):
     """
     Initialize SocketIO events for real-time doctor dashboard updates
     """
+    from flask_socketio import emit, join_room, leave_room
+
     @socketio_instance.on("join_doctor_room")
     def on_join_doctor_room(data):
         """Join doctor-specific room for real-time updates"""
@@ -227,7 +233,7 @@ def init_doctor_socketio_events(socketio_instance):
             leave_room(room)
             emit("left_room", {"room": room})
 
-def send_doctor_real_time_alert(doctor_name: str, alert_data: Dict[str, Any], socketio_instance: SocketIO):
+def send_doctor_real_time_alert(doctor_name: str, alert_data: Dict[str, Any], socketio_instance: "SocketIO"):
     """
     Send real-time alert to doctor dashboard
     """
@@ -237,7 +243,7 @@ def send_doctor_real_time_alert(doctor_name: str, alert_data: Dict[str, Any], so
     except Exception as e:
         print(f"Error sending real-time doctor alert: {str(e)}")
 
-def send_doctor_schedule_update(doctor_name: str, schedule_data: Dict[str, Any], socketio_instance: SocketIO):
+def send_doctor_schedule_update(doctor_name: str, schedule_data: Dict[str, Any], socketio_instance: "SocketIO"):
     """
     Send real-time schedule update to doctor dashboard
     """
@@ -3,202 +3,402 @@ User Dashboard for Hospital Appointment Scheduler
 Real-time dashboard with alerts, appointment management, and notifications
 """
 import os
-import json
-from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, jsonify, session
+import base64
+import logging
+import functools
+import threading
+import contextvars
+import itertools
+import secrets
+import time
+from collections import defaultdict
+from json.encoder import encode_basestring_ascii
+from cachetools import TTLCache
+from flask import Blueprint, current_app, render_template, request, session
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import asyncio
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 
-# Import our agents
-from src.agents.langchain_mcp_agent import get_hospital_agent, handle_voice_request
+if TYPE_CHECKING:
+    from src.agents.langchain_mcp_agent import HospitalSchedulerAgent
+
+logger = logging.getLogger(__name__)
 
 user_dashboard = Blueprint("user_dashboard", __name__)
 
+# Async views run on one long-lived event loop instead of a fresh loop per request,
+# so the agent and its LLM/MCP connections (and the asyncio primitives below) stay
+# bound to a single loop for the lifetime of the worker
+_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_LOOP.run_forever, name="user-dashboard-loop", daemon=True).start()
+
+def _run_on_worker_loop(coro_fn, *args, **kwargs):
+    """Run a coroutine function on the worker loop and block until it finishes"""
+    # Carry the caller's Flask request/app context over to the worker loop
+    ctx = contextvars.copy_context()
+
+    async def _runner():
+        return await asyncio.create_task(coro_fn(*args, **kwargs), context=ctx)
+
+    return asyncio.run_coroutine_threadsafe(_runner(), _LOOP).result()
+
+def _json_response(obj: Any, status: int = 200):
+    """Build a JSON response with the app's JSON provider (orjson-backed in main_enhanced)"""
+    response = current_app.json.response(obj)
+    response.status_code = status
+    return response
+
+def _json_errors(fn):
+    """Log unhandled errors from an async view and return them as a JSON 500 response"""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            logger.exception(f"Error in {fn.__name__}: {str(e)}")
+            return _json_response({"success": False, "error": str(e)}, 500)
+    return wrapper
+
+def on_worker_loop(view):
+    """Turn an async view or SocketIO handler into a sync one that runs on the worker loop"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return _run_on_worker_loop(view, *args, **kwargs)
+    return wrapper
+
+# Suffix that keeps voice conversation ids unique within a nanosecond
+_SESSION_COUNTER = itertools.count()
+
+# Resolved agent shared by all routes (get_hospital_agent returns a process-wide singleton)
+_AGENT_SINGLETON: Optional["HospitalSchedulerAgent"] = None
+_AGENT_LOCK = asyncio.Lock()
+
+async def _handle_voice_request(**kwargs) -> Dict[str, Any]:
+    """Import the voice handler on first use (keeps LangChain/MCP off the import path)"""
+    from src.agents.langchain_mcp_agent import handle_voice_request
+    return await handle_voice_request(**kwargs)
+
+async def _get_cached_agent() -> "HospitalSchedulerAgent":
+    """Return the hospital agent, resolving it on first use"""
+    global _AGENT_SINGLETON
+
+    if _AGENT_SINGLETON is not None:
+        return _AGENT_SINGLETON
+
+    async with _AGENT_LOCK:
+        if _AGENT_SINGLETON is None:
+            from src.agents.langchain_mcp_agent import get_hospital_agent
+            _AGENT_SINGLETON = await get_hospital_agent()
+        return _AGENT_SINGLETON
+
+# Phone numbers cached per SocketIO connection, plus short-lived tokens handed out on
+# join_user_room so polling HTTP routes can skip decoding the signed session cookie.
+# Entries are dropped on leave_user_room or disconnect; tokens also expire after
+# USER_TOKEN_TTL_SECONDS
+USER_TOKEN_TTL_SECONDS = int(os.environ.get("USER_TOKEN_TTL_SECONDS", "3600"))
+_SID_PHONE: Dict[str, str] = {}
+_SID_TOKEN: Dict[str, str] = {}
+_TOKEN_PHONE: TTLCache = TTLCache(maxsize=65536, ttl=USER_TOKEN_TTL_SECONDS)
+_TOKEN_LOCK = threading.Lock()
+
+def _issue_user_token(sid: str, user_phone: str) -> str:
+    """Record the phone for a SocketIO connection and return a token for its HTTP calls"""
+    token = secrets.token_urlsafe(16)
+    with _TOKEN_LOCK:
+        _revoke_user_token_locked(sid)
+        _SID_PHONE[sid] = user_phone
+        _SID_TOKEN[sid] = token
+        _TOKEN_PHONE[token] = user_phone
+    return token
+
+def _revoke_user_token_locked(sid: str):
+    """_revoke_user_token body; the caller holds _TOKEN_LOCK"""
+    _SID_PHONE.pop(sid, None)
+    token = _SID_TOKEN.pop(sid, None)
+    if token:
+        _TOKEN_PHONE.pop(token, None)
+
+def _revoke_user_token(sid: str):
+    """Forget the phone and token recorded for a SocketIO connection"""
+    with _TOKEN_LOCK:
+        _revoke_user_token_locked(sid)
+
+def release_user_connection(sid: str):
+    """Drop per-connection dashboard state; call from the app's SocketIO disconnect handler"""
+    _revoke_user_token(sid)
+
+def _current_user_phone() -> str:
+    """Resolve the caller's phone from the query string, the X-User-Token header, or the session"""
+    user_phone = request.args.get("phone")
+    if user_phone is not None:
+        return user_phone
+    token = request.headers.get("X-User-Token")
+    if token:
+        with _TOKEN_LOCK:
+            user_phone = _TOKEN_PHONE.get(token)
+        if user_phone is not None:
+            return user_phone
+    return session.get("user_phone", "")
+
+# Bound in-flight agent calls so bursts of dashboard traffic cannot overload the
+# LLM/MCP backend, and time out stuck calls so they release their slot
+AGENT_MAX_INFLIGHT = int(os.environ.get("AGENT_MAX_INFLIGHT", "8"))
+AGENT_TIMEOUT_SECONDS = float(os.environ.get("AGENT_TIMEOUT_SECONDS", "60"))
+_AGENT_SEM = asyncio.Semaphore(AGENT_MAX_INFLIGHT)
+
+async def _bounded(coro):
+    """Await an agent call under the in-flight limit and timeout"""
+    async with _AGENT_SEM:
+        return await asyncio.wait_for(coro, timeout=AGENT_TIMEOUT_SECONDS)
+
+# Clients that join with {"batch": true} get their room's events coalesced into a
+# single "batch" message (a list of {"type", "data"} events) every
+# BATCH_FLUSH_INTERVAL seconds; other clients keep receiving one
+# "new_alert"/"appointment_update" event per update
+BATCH_FLUSH_INTERVAL = 0.05
+# A room's buffer is flushed early once it holds this many events, bounding
+# per-room memory and the size of a single batch payload
+BATCH_MAX_PENDING_EVENTS = int(os.environ.get("BATCH_MAX_PENDING_EVENTS", "140"))
+_PENDING_EVENTS: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+_FLUSH_SCHEDULED: set = set()
+_PENDING_LOCK = threading.Lock()
+
+# Base64 decoding runs at memory speed, so typical payloads are decoded inline; only
+# large ones are handed to a thread so other coroutines on the loop can interleave
+LARGE_AUDIO_PAYLOAD_BYTES = 1024 * 1024
+
+async def _decode_audio(audio_data_b64: Optional[str]) -> Optional[bytes]:
+    """Decode a base64 audio payload"""
+    if not audio_data_b64:
+        return None
+    if len(audio_data_b64) > LARGE_AUDIO_PAYLOAD_BYTES:
+        return await asyncio.to_thread(base64.b64decode, audio_data_b64)
+    return base64.b64decode(audio_data_b64)
+
+# Structured agent actions; routes merge the per-request fields into these templates
+_GET_APPTS_ACTION = {"action": "get_patient_appointments", "patient_phone": None}
+_GET_ALERTS_ACTION = {"action": "get_active_alerts", "patient_phone": None}
+_GET_ANALYTICS_ACTION = {"action": "get_patient_analytics", "patient_phone": None}
+_ACK_ALERT_ACTION = {"action": "acknowledge_alert", "alert_id": None}
+_CANCEL_APPT_ACTION = {"action": "cancel_appointment", "appointment_id": None, "reason": None}
+_RESCHEDULE_APPT_ACTION = {"action": "reschedule_appointment", "appointment_id": None, "new_date": None, "new_time": None}
+_GET_DOCTORS_ACTION = {"action": "get_doctors", "filters": None}
+_AVAILABILITY_ACTION = {"action": "get_doctor_availability", "doctor_name": None, "date": None}
+
+# Agent prompt templates, filled with str.format_map
+_TMPL_GET_APPTS = "Get all appointments for patient with phone number {phone}"
+_TMPL_GET_ALERTS = "Get active alerts for patient with phone number {phone}"
+_TMPL_GET_ANALYTICS = "Get analytics for patient with phone number {phone}"
+_TMPL_ACK_ALERT = "Acknowledge alert with ID {alert_id}"
+_TMPL_CANCEL_APPT = "Cancel appointment {appointment_id} due to {reason}"
+_TMPL_RESCHEDULE_APPT = "Reschedule appointment {appointment_id} to {new_date} at {new_time}"
+_TMPL_GET_DOCTORS = "List doctors with filters: {filters}"
+_TMPL_AVAILABILITY = "Check availability for {doctor_name} on {date}"
+
 @user_dashboard.route("/dashboard")
 def dashboard():
     """Main user dashboard page"""
     return render_template("user_dashboard.html")
 
 @user_dashboard.route("/api/user/appointments")
+@on_worker_loop
+@_json_errors
 async def get_user_appointments():
     """Get appointments for the current user using LangChain MCP agent"""
-    try:
-        user_phone = request.args.get("phone", session.get("user_phone", ""))
-        if not user_phone:
-            return jsonify({"success": False, "error": "User phone not provided"}), 400
+    user_phone = _current_user_phone()
+    if not user_phone:
+        return _json_response({"success": False, "error": "User phone not provided"}, 400)
 
-        agent = await get_hospital_agent()
-        result = await agent.process_request(
-            f"Get all appointments for patient with phone number {user_phone}",
-            {"action": "get_patient_appointments", "patient_phone": user_phone}
-        )
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.process_request(
+        _TMPL_GET_APPTS.format_map({"phone": user_phone}),
+        _GET_APPTS_ACTION | {"patient_phone": user_phone}
+    ))
+    return _json_response(result)
 
 @user_dashboard.route("/api/user/alerts")
+@on_worker_loop
+@_json_errors
 async def get_user_alerts():
     """Get active alerts for the current user using LangChain MCP agent"""
-    try:
-        user_phone = request.args.get("phone", session.get("user_phone", ""))
-        if not user_phone:
-            return jsonify({"success": False, "error": "User phone not provided"}), 400
+    user_phone = _current_user_phone()
+    if not user_phone:
+        return _json_response({"success": False, "error": "User phone not provided"}, 400)
 
-        agent = await get_hospital_agent()
-        result = await agent.process_request(
-            f"Get active alerts for patient with phone number {user_phone}",
-            {"action": "get_active_alerts", "patient_phone": user_phone}
-        )
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.process_request(
+        _TMPL_GET_ALERTS.format_map({"phone": user_phone}),
+        _GET_ALERTS_ACTION | {"patient_phone": user_phone}
+    ))
+    return _json_response(result)
 
 @user_dashboard.route("/api/user/schedule", methods=["POST"])
+@on_worker_loop
+@_json_errors
 async def schedule_appointment_route():
     """Schedule a new appointment using LangChain MCP agent"""
-    try:
-        data = request.get_json()
-        patient_info = data.get("patient_info", {})
+    data = request.get_json()
+    patient_info = data.get("patient_info", {})
 
-        if not patient_info:
-            return jsonify({"success": False, "error": "Missing patient_info"}), 400
+    if not patient_info:
+        return _json_response({"success": False, "error": "Missing patient_info"}, 400)
 
-        agent = await get_hospital_agent()
-        result = await agent.schedule_appointment_flow(patient_info)
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.schedule_appointment_flow(patient_info))
+    return _json_response(result)
 
 @user_dashboard.route("/api/user/voice", methods=["POST"])
+@on_worker_loop
+@_json_errors
 async def process_voice_route():
     """Process voice input from user using LangChain MCP agent"""
-    try:
-        data = request.get_json()
-        voice_text = data.get("text", "")
-        conversation_id = data.get("conversation_id", "")
-        audio_data_b64 = data.get("audio_data")
+    data = request.get_json()
+    voice_text = data.get("text", "")
+    conversation_id = data.get("conversation_id", "")
+    audio_data_b64 = data.get("audio_data")
 
-        if not audio_data_b64 and not voice_text:
-            return jsonify({"success": False, "error": "No audio data or user text provided"}), 400
+    if not audio_data_b64 and not voice_text:
+        return _json_response({"success": False, "error": "No audio data or user text provided"}, 400)
 
-        audio_data = base64.b64decode(audio_data_b64) if audio_data_b64 else None
+    audio_data = await _decode_audio(audio_data_b64)
 
-        result = await handle_voice_request(audio_data=audio_data, user_text=voice_text, conversation_id=conversation_id)
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    result = await _handle_voice_request(audio_data=audio_data, user_text=voice_text, conversation_id=conversation_id)
+    return _json_response(result)
 
 @user_dashboard.route("/api/user/acknowledge_alert", methods=["POST"])
+@on_worker_loop
+@_json_errors
 async def acknowledge_alert_route():
     """Acknowledge an alert using LangChain MCP agent"""
-    try:
-        data = request.get_json()
-        alert_id = data.get("alert_id")
+    data = request.get_json()
+    alert_id = data.get("alert_id")
 
-        if not alert_id:
-            return jsonify({"success": False, "error": "Missing alert_id"}), 400
+    if not alert_id:
+        return _json_response({"success": False, "error": "Missing alert_id"}, 400)
 
-        agent = await get_hospital_agent()
-        result = await agent.process_request(
-            f"Acknowledge alert with ID {alert_id}",
-            {"action": "acknowledge_alert", "alert_id": alert_id}
-        )
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.process_request(
+        _TMPL_ACK_ALERT.format_map({"alert_id": alert_id}),
+        _ACK_ALERT_ACTION | {"alert_id": alert_id}
+    ))
+    return _json_response(result)
 
 @user_dashboard.route("/api/user/cancel_appointment", methods=["POST"])
+@on_worker_loop
+@_json_errors
 async def cancel_appointment_route():
     """Cancel an appointment using LangChain MCP agent"""
-    try:
-        data = request.get_json()
-        appointment_id = data.get("appointment_id")
-        reason = data.get("reason", "User requested cancellation")
+    data = request.get_json()
+    appointment_id = data.get("appointment_id")
+    reason = data.get("reason", "User requested cancellation")
 
-        if not appointment_id:
-            return jsonify({"success": False, "error": "Missing appointment_id"}), 400
+    if not appointment_id:
+        return _json_response({"success": False, "error": "Missing appointment_id"}, 400)
 
-        agent = await get_hospital_agent()
-        result = await agent.process_request(
-            f"Cancel appointment {appointment_id} due to {reason}",
-            {"action": "cancel_appointment", "appointment_id": appointment_id, "reason": reason}
-        )
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.process_request(
+        _TMPL_CANCEL_APPT.format_map({"appointment_id": appointment_id, "reason": reason}),
+        _CANCEL_APPT_ACTION | {"appointment_id": appointment_id, "reason": reason}
+    ))
+    return _json_response(result)
 
 @user_dashboard.route("/api/user/reschedule_appointment", methods=["POST"])
+@on_worker_loop
+@_json_errors
 async def reschedule_appointment_route():
     """
     Reschedule an appointment using LangChain MCP agent
     """
-    try:
-        data = request.get_json()
-        appointment_id = data.get("appointment_id")
-        new_date = data.get("new_date")
-        new_time = data.get("new_time")
-
-        if not all([appointment_id, new_date, new_time]):
-            return jsonify({"success": False, "error": "Missing required parameters"}), 400
-
-        agent = await get_hospital_agent()
-        result = await agent.process_request(
-            f"Reschedule appointment {appointment_id} to {new_date} at {new_time}",
-            {"action": "reschedule_appointment", "appointment_id": appointment_id, "new_date": new_date, "new_time": new_time}
-        )
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    data = request.get_json()
+    appointment_id = data.get("appointment_id")
+    new_date = data.get("new_date")
+    new_time = data.get("new_time")
+
+    if not all([appointment_id, new_date, new_time]):
+        return _json_response({"success": False, "error": "Missing required parameters"}, 400)
+
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.process_request(
+        _TMPL_RESCHEDULE_APPT.format_map({"appointment_id": appointment_id, "new_date": new_date, "new_time": new_time}),
+        _RESCHEDULE_APPT_ACTION | {"appointment_id": appointment_id, "new_date": new_date, "new_time": new_time}
+    ))
+    return _json_response(result)
+
+# Doctor listings change rarely, so agent results are reused for a short window
+DOCTORS_CACHE_TTL_SECONDS = 30
+_doctors_result_cache: TTLCache = TTLCache(maxsize=256, ttl=DOCTORS_CACHE_TTL_SECONDS)
+_doctors_result_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1024)
+def _dumps_doctor_filters(department: str) -> str:
+    """Serialize the fixed-shape {"department": ...} filter, matching json.dumps output"""
+    if not department:
+        return "{}"
+    return '{"department": ' + encode_basestring_ascii(department) + '}'
+
+@functools.lru_cache(maxsize=64)
+def _doctors_prompt(department: str) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Build the doctor-listing prompt and its (frozen) filters for a department"""
+    filter_items = (("department", department),) if department else ()
+    return _TMPL_GET_DOCTORS.format_map({"filters": _dumps_doctor_filters(department)}), filter_items
 
 @user_dashboard.route("/api/user/doctors")
+@on_worker_loop
+@_json_errors
 async def get_doctors_route():
     """Get list of available doctors using LangChain MCP agent"""
-    try:
-        department = request.args.get("department", "")
-        filters = {"department": department} if department else {}
-
-        agent = await get_hospital_agent()
-        result = await agent.process_request(
-            f"List doctors with filters: {json.dumps(filters)}",
-            {"action": "get_doctors", "filters": filters}
-        )
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    department = request.args.get("department", "")
+
+    with _doctors_result_lock:
+        cached = _doctors_result_cache.get(department)
+    if cached is not None:
+        return _json_response(cached)
+
+    prompt, filter_items = _doctors_prompt(department)
+    filters = dict(filter_items)
+
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.process_request(
+        prompt,
+        _GET_DOCTORS_ACTION | {"filters": filters}
+    ))
+    if result.get("success"):
+        with _doctors_result_lock:
+            _doctors_result_cache[department] = result
+    return _json_response(result)
 
 @user_dashboard.route("/api/user/availability")
+@on_worker_loop
+@_json_errors
 async def check_availability_route():
     """Check doctor availability for a specific date using LangChain MCP agent"""
-    try:
-        doctor_name = request.args.get("doctor")
-        date = request.args.get("date")
+    doctor_name = request.args.get("doctor")
+    date = request.args.get("date")
 
-        if not all([doctor_name, date]):
-            return jsonify({"success": False, "error": "Doctor name and date are required"}), 400
+    if not all([doctor_name, date]):
+        return _json_response({"success": False, "error": "Doctor name and date are required"}, 400)
 
-        agent = await get_hospital_agent()
-        result = await agent.process_request(
-            f"Check availability for {doctor_name} on {date}",
-            {"action": "get_doctor_availability", "doctor_name": doctor_name, "date": date}
-        )
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.process_request(
+        _TMPL_AVAILABILITY.format_map({"doctor_name": doctor_name, "date": date}),
+        _AVAILABILITY_ACTION | {"doctor_name": doctor_name, "date": date}
+    ))
+    return _json_response(result)
 
 # ============================================================================
 # WEBSOCKET EVENTS FOR REAL-TIME UPDATES
 # ============================================================================
 
+@functools.lru_cache(maxsize=8192)
+def _room_for(phone: str) -> str:
+    """SocketIO room name for a user's phone number"""
+    return f"user_{phone}"
+
+@functools.lru_cache(maxsize=8192)
+def _batch_room_for(phone: str) -> str:
+    """SocketIO room for a user's clients that opted into batched events"""
+    return f"user_{phone}:batch"
+
 def init_socketio_events(socketio_instance):
     """Initialize SocketIO events for real-time dashboard updates"""
     
@@ -207,30 +407,34 @@ def init_socketio_events(socketio_instance):
         """Join user-specific room for real-time updates"""
         user_phone = data.get("phone", session.get("user_phone"))
         if user_phone:
-            room = f"user_{user_phone}"
+            room = _batch_room_for(user_phone) if data.get("batch") else _room_for(user_phone)
             join_room(room)
-            emit("joined_room", {"room": room})
+            user_token = _issue_user_token(request.sid, user_phone)
+            emit("joined_room", {"room": room, "user_token": user_token})
     
     @socketio_instance.on("leave_user_room")
     def on_leave_user_room(data):
         """Leave user-specific room"""
-        user_phone = data.get("phone", session.get("user_phone"))
+        user_phone = data.get("phone") or _SID_PHONE.get(request.sid) or session.get("user_phone")
         if user_phone:
-            room = f"user_{user_phone}"
+            room = _room_for(user_phone)
             leave_room(room)
+            leave_room(_batch_room_for(user_phone))
+            _revoke_user_token(request.sid)
             emit("left_room", {"room": room})
     
     @socketio_instance.on("request_voice_session")
+    @on_worker_loop
     async def on_request_voice_session(data):
         """Start a voice interaction session"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        conversation_id = f"voice_{timestamp}"
+        conversation_id = f"voice_{time.time_ns():x}_{next(_SESSION_COUNTER)}"
         emit("voice_session_started", {
             "conversation_id": conversation_id,
             "message": "Voice session started. You can now speak your request."
         })
     
     @socketio_instance.on("voice_input")
+    @on_worker_loop
     async def on_voice_input(data):
         """Handle voice input from user"""
         try:
@@ -238,9 +442,9 @@ def init_socketio_events(socketio_instance):
             conversation_id = data.get("conversation_id", "")
             audio_data_b64 = data.get("audio_data")
 
-            audio_data = base64.b64decode(audio_data_b64) if audio_data_b64 else None
+            audio_data = await _decode_audio(audio_data_b64)
             
-            result = await handle_voice_request(audio_data=audio_data, user_text=voice_text, conversation_id=conversation_id)
+            result = await _handle_voice_request(audio_data=audio_data, user_text=voice_text, conversation_id=conversation_id)
             emit("voice_response", result)
                 
         except Exception as e:
@@ -249,42 +453,97 @@ def init_socketio_events(socketio_instance):
                 "message": "Sorry, I encountered an error processing your voice input."
             })
 
+def _queue_room_event(room: str, event: Dict[str, Any], socketio_instance: SocketIO):
+    """Buffer an event for a room; the buffer is emitted as one "batch" message per flush window"""
+    flush_now = None
+    schedule_flush = False
+    with _PENDING_LOCK:
+        pending = _PENDING_EVENTS[room]
+        pending.append(event)
+        if len(pending) >= BATCH_MAX_PENDING_EVENTS:
+            flush_now = _PENDING_EVENTS.pop(room)
+        elif room not in _FLUSH_SCHEDULED:
+            _FLUSH_SCHEDULED.add(room)
+            schedule_flush = True
+
+    if flush_now:
+        socketio_instance.emit("batch", flush_now, room=room)
+    if schedule_flush:
+        socketio_instance.start_background_task(_flush_after, room, socketio_instance, BATCH_FLUSH_INTERVAL)
+
+def _flush_after(room: str, socketio_instance: SocketIO, delay: float):
+    """Emit everything buffered for a room after the flush window has elapsed"""
+    socketio_instance.sleep(delay)
+    with _PENDING_LOCK:
+        _FLUSH_SCHEDULED.discard(room)
+        batch = _PENDING_EVENTS.pop(room, None)
+    if batch:
+        socketio_instance.emit("batch", batch, room=room)
+
 def send_real_time_alert(user_phone: str, alert_data: Dict[str, Any], socketio_instance: SocketIO):
     """Send real-time alert to user dashboard"""
     try:
-        room = f"user_{user_phone}"
-        socketio_instance.emit("new_alert", alert_data, room=room)
+        socketio_instance.emit("new_alert", alert_data, room=_room_for(user_phone))
+        _queue_room_event(_batch_room_for(user_phone), {"type": "new_alert", "data": alert_data}, socketio_instance)
     except Exception as e:
-        print(f"Error sending real-time alert: {str(e)}")
+        logger.error(f"Error sending real-time alert: {str(e)}")
 
 def send_appointment_update(user_phone: str, appointment_data: Dict[str, Any], socketio_instance: SocketIO):
     """Send real-time appointment update to user dashboard"""
     try:
-        room = f"user_{user_phone}"
-        socketio_instance.emit("appointment_update", appointment_data, room=room)
+        socketio_instance.emit("appointment_update", appointment_data, room=_room_for(user_phone))
+        _queue_room_event(_batch_room_for(user_phone), {"type": "appointment_update", "data": appointment_data}, socketio_instance)
     except Exception as e:
-        print(f"Error sending appointment update: {str(e)}")
+        logger.error(f"Error sending appointment update: {str(e)}")
 
 # ============================================================================
 # DASHBOARD ANALYTICS
 # ============================================================================
 
 @user_dashboard.route("/api/user/analytics")
+@on_worker_loop
+@_json_errors
 async def get_user_analytics_route():
     """Get user dashboard analytics using LangChain MCP agent"""
-    try:
-        user_phone = request.args.get("phone", session.get("user_phone", ""))
-        if not user_phone:
-            return jsonify({"success": False, "error": "User phone not provided"}), 400
-
-        agent = await get_hospital_agent()
-        result = await agent.process_request(
-            f"Get analytics for patient with phone number {user_phone}",
-            {"action": "get_patient_analytics", "patient_phone": user_phone}
-        )
-        return jsonify(result)
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
-
-
+    user_phone = _current_user_phone()
+    if not user_phone:
+        return _json_response({"success": False, "error": "User phone not provided"}, 400)
+
+    agent = await _get_cached_agent()
+    result = await _bounded(agent.process_request(
+        _TMPL_GET_ANALYTICS.format_map({"phone": user_phone}),
+        _GET_ANALYTICS_ACTION | {"patient_phone": user_phone}
+    ))
+    return _json_response(result)
+
+@user_dashboard.route("/api/user/overview")
+@on_worker_loop
+@_json_errors
+async def get_user_overview_route():
+    """Get appointments, alerts and analytics for the dashboard in one call, querying the agent concurrently"""
+    user_phone = _current_user_phone()
+    if not user_phone:
+        return _json_response({"success": False, "error": "User phone not provided"}, 400)
+
+    agent = await _get_cached_agent()
+
+    appointments, alerts, analytics = await asyncio.gather(
+        _bounded(agent.process_request(
+            _TMPL_GET_APPTS.format_map({"phone": user_phone}),
+            _GET_APPTS_ACTION | {"patient_phone": user_phone}
+        )),
+        _bounded(agent.process_request(
+            _TMPL_GET_ALERTS.format_map({"phone": user_phone}),
+            _GET_ALERTS_ACTION | {"patient_phone": user_phone}
+        )),
+        _bounded(agent.process_request(
+            _TMPL_GET_ANALYTICS.format_map({"phone": user_phone}),
+            _GET_ANALYTICS_ACTION | {"patient_phone": user_phone}
+        ))
+    )
+    return _json_response({
+        "success": True,
+        "appointments": appointments,
+        "alerts": alerts,
+        "analytics": analytics
+    })
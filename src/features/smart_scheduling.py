@@ -3,50 +3,122 @@ Smart Scheduling Features for Hospital Appointment Scheduler
 Innovative features to enhance the appointment scheduling experience
 """
 import json
+import numpy as np
+import orjson
+from collections import Counter, defaultdict
 from datetime import datetime, date, time, timedelta
 from typing import Dict, Any, Optional, List, Tuple
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
 from src.models.appointment import Appointment, Doctor, Patient, db
 import os
+import re
+import hashlib
+import functools
+import threading
+import logging
+from cachetools import TTLCache
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Case-insensitive keyword groups used to score rescheduling reasons and appointment notes
+_RESCHEDULE_URGENT_RE = re.compile(r'emergency|urgent|pain|severe', re.I)
+_RESCHEDULE_CONFLICT_RE = re.compile(r'conflict|work|travel', re.I)
+_PRIORITY_URGENT_RE = re.compile(r'urgent|emergency|pain', re.I)
+_PRIORITY_ROUTINE_RE = re.compile(r'follow-up|routine', re.I)
+_URGENT_CONDITION_RE = re.compile(r'urgent|emergency', re.I)
+_FOLLOW_UP_RE = re.compile(r'follow-up', re.I)
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Appointments older than this are left out of the LLM prompt history
+HISTORY_LOOKBACK_DAYS = 183
+
+# 'HH:MM' label for every minute of the day
+_SLOT_LABELS = [f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)]
+
+@functools.lru_cache(maxsize=512)
+def _parsed_available_days(doctor_id: int, raw: str) -> frozenset:
+    """Parse a doctor's available_days JSON into a set of lowercase day names"""
+    return frozenset(day.lower() for day in json.loads(raw))
+
+# Bumped on every appointment write so cached slot summaries go stale immediately
+_appointments_version = 0
+
+def _bump_appointments_version(mapper, connection, target):
+    global _appointments_version
+    _appointments_version += 1
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Appointment, _event_name, _bump_appointments_version)
+
+# LLM client, prompt and chain are built once per process and shared by all engines
+_LLM = None
+_SCHEDULING_PROMPT = None
+_SCHEDULING_CHAIN = None
+_CHAIN_LOCK = threading.Lock()
+
+def _get_scheduling_chain():
+    """Build the shared scheduling prompt | LLM chain on first use"""
+    global _LLM, _SCHEDULING_PROMPT, _SCHEDULING_CHAIN
+    if _SCHEDULING_CHAIN is not None:
+        return _SCHEDULING_CHAIN
+    
+    with _CHAIN_LOCK:
+        if _SCHEDULING_CHAIN is None:
+            _LLM = ChatGoogleGenerativeAI(
+                model="gemini-1.5-flash",
+                google_api_key=os.getenv("GOOGLE_API_KEY", "your-api-key-here"),
+                temperature=0.3
+            )
+            
+            _SCHEDULING_PROMPT = ChatPromptTemplate.from_messages([
+                ("system", """You are an intelligent hospital scheduling assistant. 
+                Based on the patient's request, medical history, and current availability, 
+                provide smart scheduling recommendations.
+                
+                Consider:
+                - Urgency of the medical condition
+                - Doctor specialization match
+                - Patient preferences
+                - Optimal appointment timing
+                - Follow-up requirements
+                
+                Return recommendations in JSON format with:
+                - recommended_doctor: best doctor match
+                - recommended_time: optimal time slot
+                - urgency_level: low/medium/high
+                - reasoning: explanation for the recommendation
+                - alternative_options: list of alternatives
+                """),
+                ("human", "Patient Request: {patient_request}"),
+                # Volatile context goes last so the static prefix above stays cacheable
+                ("human", """
+                Available Doctors: {available_doctors}
+                Available Slots: {available_slots}
+                Patient History: {patient_history}
+                """)
+            ])
+            
+            _SCHEDULING_CHAIN = _SCHEDULING_PROMPT | _LLM
+    return _SCHEDULING_CHAIN
 
 class SmartSchedulingEngine:
     """Advanced scheduling engine with AI-powered features"""
     
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY", "your-api-key-here"),
-            temperature=0.3
-        )
+        self._scheduling_chain = _get_scheduling_chain()
+        self.llm = _LLM
+        self.scheduling_prompt = _SCHEDULING_PROMPT
+        
+        # Parsed LLM recommendations keyed by request, patient and availability
+        self._llm_cache = TTLCache(maxsize=1024, ttl=300)
+        self._llm_cache_lock = threading.Lock()
         
-        # Prompt for intelligent scheduling suggestions
-        self.scheduling_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an intelligent hospital scheduling assistant. 
-            Based on the patient's request, medical history, and current availability, 
-            provide smart scheduling recommendations.
-            
-            Consider:
-            - Urgency of the medical condition
-            - Doctor specialization match
-            - Patient preferences
-            - Optimal appointment timing
-            - Follow-up requirements
-            
-            Return recommendations in JSON format with:
-            - recommended_doctor: best doctor match
-            - recommended_time: optimal time slot
-            - urgency_level: low/medium/high
-            - reasoning: explanation for the recommendation
-            - alternative_options: list of alternatives
-            """),
-            ("human", """
-            Patient Request: {patient_request}
-            Available Doctors: {available_doctors}
-            Available Slots: {available_slots}
-            Patient History: {patient_history}
-            """)
-        ])
+        # Weekly slot summary, also invalidated by any appointment write
+        self._summary_cache = TTLCache(maxsize=4, ttl=30)
+        self._summary_cache_lock = threading.Lock()
     
     def get_smart_recommendations(self, patient_request: str, patient_phone: str = None) -> Dict[str, Any]:
         """Get AI-powered scheduling recommendations"""
@@ -55,22 +127,53 @@ class SmartSchedulingEngine:
             available_doctors = self._get_available_doctors()
             available_slots = self._get_available_slots_summary()
             
+            # Nothing bookable this week, so there is nothing for the LLM to recommend
+            if not any(count for day in available_slots.values() for count in day.values()):
+                # Same shape as an LLM recommendation, with no doctor or time to offer
+                recommendations = {
+                    'recommended_doctor': None,
+                    'recommended_time': None,
+                    'urgency_level': 'low',
+                    'reasoning': 'No availability in next 7 days',
+                    'alternative_options': []
+                }
+                recommendations['smart_features'] = self._add_smart_features(patient_request, recommendations)
+                return {
+                    'success': True,
+                    'recommendations': recommendations,
+                    'timestamp': datetime.now().isoformat()
+                }
+            
             # Get patient history if phone provided
             patient_history = {}
             if patient_phone:
-                patient_history = self._get_patient_history(patient_phone)
+                patient_history = self._summarize_history(self._get_patient_history(patient_phone))
+            
+            # Canonical JSON so identical availability renders an identical prompt
+            doctors_json = orjson.dumps(available_doctors, default=str, option=orjson.OPT_SORT_KEYS).decode()
+            slots_json = orjson.dumps(available_slots, default=str, option=orjson.OPT_SORT_KEYS).decode()
             
-            # Generate recommendations using AI
-            chain = self.scheduling_prompt | self.llm
-            response = chain.invoke({
-                "patient_request": patient_request,
-                "available_doctors": json.dumps(available_doctors, default=str),
-                "available_slots": json.dumps(available_slots, default=str),
-                "patient_history": json.dumps(patient_history, default=str)
-            })
+            # Reuse a recent LLM answer for the same request, patient and availability
+            availability_hash = hashlib.blake2b(slots_json.encode(), digest_size=16).hexdigest()
+            cache_key = (patient_request, patient_phone or '', availability_hash)
+            with self._llm_cache_lock:
+                cached = self._llm_cache.get(cache_key)
             
-            # Parse AI response
-            recommendations = self._parse_ai_response(response.content)
+            if cached is not None:
+                recommendations = dict(cached)
+            else:
+                # Generate recommendations using AI
+                response = self._scheduling_chain.invoke({
+                    "patient_request": patient_request,
+                    "available_doctors": doctors_json,
+                    "available_slots": slots_json,
+                    "patient_history": orjson.dumps(patient_history, default=str).decode()
+                })
+                
+                # Parse AI response
+                recommendations = self._parse_ai_response(response.content)
+                with self._llm_cache_lock:
+                    self._llm_cache[cache_key] = dict(recommendations)
             
             # Enhance with additional smart features
             recommendations['smart_features'] = self._add_smart_features(patient_request, recommendations)
@@ -95,22 +198,35 @@ class SmartSchedulingEngine:
                 return []
             
             # Get next 14 days of availability
-            optimal_slots = []
-            start_date = datetime.now().date() + timedelta(days=1)
+            today = datetime.now().date()
+            start_date = today + timedelta(days=1)
+            dates = [start_date + timedelta(days=i) for i in range(14)]
+            
+            # One bookings query for the whole window instead of one per day
+            booked_times = self._get_booked_times(dates, doctor_name)
+            candidates = []
+            
+            for check_date in dates:
+                day_slots = self._compute_slots_for_doctor(doctor, check_date, booked_times.get((doctor_name, check_date), set()))
+                candidates.extend((check_date, slot_time) for slot_time in day_slots)
+            
+            # Score every candidate slot in one vectorized pass
+            scores = self._calculate_time_scores(
+                np.array([check_date.weekday() for check_date, _ in candidates], dtype=np.int8),
+                np.array([int(slot_time.split(':')[0]) for _, slot_time in candidates], dtype=np.int8),
+                np.array([(check_date - today).days for check_date, _ in candidates], dtype=np.int32),
+                patient_preferences.get('urgency', 'medium') == 'high'
+            )
             
-            for i in range(14):
-                check_date = start_date + timedelta(days=i)
-                day_slots = self._get_available_slots_for_date(doctor_name, check_date.strftime('%Y-%m-%d'))
-                
-                for slot_time in day_slots:
-                    score = self._calculate_time_score(check_date, slot_time, patient_preferences)
-                    optimal_slots.append({
-                        'date': check_date.strftime('%Y-%m-%d'),
-                        'time': slot_time,
-                        'score': score,
-                        'day_of_week': check_date.strftime('%A'),
-                        'reasons': self._get_score_reasons(check_date, slot_time, score)
-                    })
+            optimal_slots = []
+            for (check_date, slot_time), score in zip(candidates, scores.tolist()):
+                optimal_slots.append({
+                    'date': check_date.strftime('%Y-%m-%d'),
+                    'time': slot_time,
+                    'score': score,
+                    'day_of_week': check_date.strftime('%A'),
+                    'reasons': self._get_score_reasons(check_date, slot_time, score)
+                })
             
             # Sort by score and return top recommendations
             optimal_slots.sort(key=lambda x: x['score'], reverse=True)
@@ -153,20 +269,22 @@ class SmartSchedulingEngine:
     def conflict_resolution(self, conflicting_appointments: List[int]) -> Dict[str, Any]:
         """Resolve scheduling conflicts intelligently"""
         try:
-            appointments = [Appointment.query.get(apt_id) for apt_id in conflicting_appointments]
-            appointments = [apt for apt in appointments if apt]
+            rows = Appointment.query.filter(Appointment.id.in_(conflicting_appointments)).all()
+            by_id = {apt.id: apt for apt in rows}
+            appointments = [by_id[apt_id] for apt_id in conflicting_appointments if apt_id in by_id]
             
             if len(appointments) < 2:
                 return {'success': False, 'error': 'Need at least 2 appointments for conflict resolution'}
             
             # Analyze priority of each appointment
+            now = datetime.now()
             priorities = []
             for apt in appointments:
-                priority_score = self._calculate_appointment_priority(apt)
+                priority_score = self._calculate_appointment_priority(apt, now)
                 priorities.append({
                     'appointment': apt.to_dict(),
                     'priority_score': priority_score,
-                    'priority_factors': self._get_priority_factors(apt)
+                    'priority_factors': self._get_priority_factors(apt, now)
                 })
             
             # Sort by priority
@@ -188,19 +306,24 @@ class SmartSchedulingEngine:
     def predictive_scheduling(self, patient_phone: str) -> Dict[str, Any]:
         """Predict future scheduling needs based on patient history"""
         try:
-            patient_history = self._get_patient_history(patient_phone)
+            rows = self._get_patient_history_compact(patient_phone)
             
-            if not patient_history.get('appointments'):
+            if not rows:
                 return {
                     'success': False,
                     'message': 'Insufficient history for predictions'
                 }
             
-            # Analyze patterns
-            patterns = self._analyze_appointment_patterns(patient_history['appointments'])
+            # Analyze patterns straight from the projected columns
+            apt_dates, departments, apt_times = zip(*rows)
+            patterns = self._analyze_pattern_columns(
+                np.array(apt_dates, dtype='datetime64[D]'),
+                list(departments),
+                np.fromiter((t.hour for t in apt_times), dtype=np.int8, count=len(apt_times))
+            )
             
-            # Predict next appointment needs
-            predictions = self._predict_future_appointments(patterns, patient_history)
+            # Predict next appointment needs from the most recent visit
+            predictions = self._predict_future_appointments(patterns, apt_dates[-1])
             
             # Generate proactive recommendations
             proactive_recommendations = self._generate_proactive_recommendations(predictions)
@@ -218,113 +341,168 @@ class SmartSchedulingEngine:
     
     def _get_available_doctors(self) -> List[Dict[str, Any]]:
         """Get list of available doctors with their specializations"""
-        doctors = Doctor.query.filter_by(is_active=True).all()
-        return [doctor.to_dict() for doctor in doctors]
+        doctors = db.session.query(Doctor.name, Doctor.specialization, Doctor.department).filter_by(is_active=True).all()
+        return [
+            {'name': name, 'specialization': specialization, 'department': department}
+            for name, specialization, department in doctors
+        ]
     
     def _get_available_slots_summary(self) -> Dict[str, Any]:
         """Get summary of available slots for next 7 days"""
-        summary = {}
         start_date = datetime.now().date() + timedelta(days=1)
+        cache_key = (start_date, _appointments_version)
+        with self._summary_cache_lock:
+            cached = self._summary_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        for i in range(7):
-            check_date = start_date + timedelta(days=i)
-            date_str = check_date.strftime('%Y-%m-%d')
-            summary[date_str] = {}
-            
-            doctors = Doctor.query.filter_by(is_active=True).all()
-            for doctor in doctors:
-                slots = self._get_available_slots_for_date(doctor.name, date_str)
-                summary[date_str][doctor.name] = len(slots)
+        dates = [start_date + timedelta(days=i) for i in range(7)]
+        date_strs = [check_date.strftime('%Y-%m-%d') for check_date in dates]
+        summary = {date_str: {} for date_str in date_strs}
         
+        # Load doctors and the week's bookings once instead of per day/slot
+        doctors = Doctor.query.filter_by(is_active=True).all()
+        booked_times = self._get_booked_times(dates)
+        
+        for doctor in doctors:
+            # One doctor with a bad schedule row must not break the summary for everyone
+            try:
+                counts = [
+                    len(self._compute_slots_for_doctor(doctor, check_date, booked_times.get((doctor.name, check_date), set())))
+                    for check_date in dates
+                ]
+            except Exception as e:
+                logger.warning(f"Skipping doctor {doctor.name} in slot summary: {str(e)}")
+                continue
+            for date_str, count in zip(date_strs, counts):
+                summary[date_str][doctor.name] = count
+        
+        with self._summary_cache_lock:
+            self._summary_cache[cache_key] = summary
         return summary
     
-    def _get_available_slots_for_date(self, doctor_name: str, date_str: str) -> List[str]:
-        """Get available slots for a specific doctor and date"""
-        try:
-            apt_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            
-            doctor = Doctor.query.filter_by(name=doctor_name, is_active=True).first()
-            if not doctor:
-                return []
-            
-            # Check if date is a working day
-            day_of_week = apt_date.strftime('%A').lower()
-            available_days = json.loads(doctor.available_days)
-            if day_of_week not in [day.lower() for day in available_days]:
-                return []
-            
-            # Generate all possible time slots
-            current_time = datetime.combine(apt_date, doctor.start_time)
-            end_time = datetime.combine(apt_date, doctor.end_time)
-            duration = timedelta(minutes=doctor.consultation_duration)
-            
-            available_slots = []
-            
-            while current_time + duration <= end_time:
-                slot_time = current_time.time()
-                
-                # Check if this slot is already booked
-                existing_appointment = Appointment.query.filter_by(
-                    doctor_name=doctor_name,
-                    appointment_date=apt_date,
-                    appointment_time=slot_time,
-                    status='scheduled'
-                ).first()
-                
-                if not existing_appointment:
-                    available_slots.append(slot_time.strftime('%H:%M'))
-                
-                current_time += duration
-            
-            return available_slots
-            
-        except Exception:
+    def _get_booked_times(self, dates: List[date], doctor_name: Optional[str] = None) -> Dict[Tuple[str, date], set]:
+        """Get booked appointment times for the given dates, keyed by (doctor_name, date)"""
+        query = Appointment.query.with_entities(
+            Appointment.doctor_name,
+            Appointment.appointment_date,
+            Appointment.appointment_time
+        ).filter(
+            Appointment.appointment_date.in_(dates),
+            Appointment.status == 'scheduled'
+        )
+        if doctor_name:
+            query = query.filter(Appointment.doctor_name == doctor_name)
+        rows = query.all()
+        
+        booked_times = defaultdict(set)
+        for doctor_name, apt_date, apt_time in rows:
+            booked_times[(doctor_name, apt_date)].add(apt_time)
+        return booked_times
+    
+    def _compute_slots_for_doctor(self, doctor: Doctor, apt_date: date, booked: set) -> List[str]:
+        """Get free slots for an already-loaded doctor on a date, given the set of booked times"""
+        # Check if date is a working day
+        day_of_week = apt_date.strftime('%A').lower()
+        if day_of_week not in _parsed_available_days(doctor.id, doctor.available_days):
             return []
+        
+        # Generate all possible time slots as minutes since midnight
+        start_min = doctor.start_time.hour * 60 + doctor.start_time.minute
+        end_min = doctor.end_time.hour * 60 + doctor.end_time.minute
+        step = doctor.consultation_duration
+        slot_minutes = np.arange(start_min, end_min - step + 1, step)
+        
+        # Drop slots that are already booked
+        booked_minutes = {t.hour * 60 + t.minute for t in booked}
+        return [_SLOT_LABELS[m] for m in slot_minutes.tolist() if m not in booked_minutes]
     
     def _get_patient_history(self, patient_phone: str) -> Dict[str, Any]:
         """Get patient's appointment history"""
         try:
-            patient = Patient.query.filter_by(phone=patient_phone).first()
-            appointments = Appointment.query.filter_by(patient_phone=patient_phone).all()
+            patient = db.session.query(
+                Patient.name, Patient.gender, Patient.date_of_birth, Patient.medical_history
+            ).filter_by(phone=patient_phone).first()
+            rows = db.session.query(
+                Appointment.doctor_name, Appointment.department, Appointment.appointment_date,
+                Appointment.appointment_time, Appointment.status, Appointment.notes
+            ).filter_by(patient_phone=patient_phone).order_by(Appointment.id).all()
+            
+            appointments = [
+                {
+                    'doctor_name': doctor_name,
+                    'department': department,
+                    'appointment_date': apt_date.isoformat() if apt_date else None,
+                    'appointment_time': apt_time.isoformat() if apt_time else None,
+                    'status': status,
+                    'notes': notes
+                }
+                for doctor_name, department, apt_date, apt_time, status, notes in rows
+            ]
             
             return {
-                'patient': patient.to_dict() if patient else None,
-                'appointments': [apt.to_dict() for apt in appointments],
+                'patient': {
+                    'name': patient.name,
+                    'gender': patient.gender,
+                    'date_of_birth': patient.date_of_birth.isoformat() if patient.date_of_birth else None,
+                    'medical_history': patient.medical_history
+                } if patient else None,
+                'appointments': appointments,
                 'total_appointments': len(appointments),
-                'last_appointment': appointments[-1].to_dict() if appointments else None
+                'last_appointment': appointments[-1] if appointments else None
             }
             
         except Exception:
             return {}
     
+    def _summarize_history(self, history: Dict[str, Any]) -> Dict[str, Any]:
+        """Compact patient history for the LLM prompt: recent visits plus patterns"""
+        if not history:
+            return {}
+        
+        # Only the last six months are relevant to scheduling
+        cutoff = (date.today() - timedelta(days=HISTORY_LOOKBACK_DAYS)).isoformat()
+        recent = sorted(
+            (apt for apt in history.get('appointments', []) if (apt.get('appointment_date') or '') >= cutoff),
+            key=lambda apt: (apt['appointment_date'], apt.get('appointment_time') or '')
+        )
+        
+        return {
+            'patient': history.get('patient'),
+            'last_3_appointments': recent[-3:],
+            'total': history.get('total_appointments', 0),
+            'patterns': self._analyze_appointment_patterns(recent)
+        }
+    
+    def _get_patient_history_compact(self, patient_phone: str) -> List[Tuple[date, str, time]]:
+        """Get (date, department, time) for each of a patient's appointments, oldest first"""
+        return db.session.query(
+            Appointment.appointment_date, Appointment.department, Appointment.appointment_time
+        ).filter_by(patient_phone=patient_phone).order_by(
+            Appointment.appointment_date, Appointment.appointment_time
+        ).all()
+    
     def _parse_ai_response(self, response_text: str) -> Dict[str, Any]:
         """Parse AI response and extract recommendations"""
-        try:
-            # Try to find JSON in the response
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != 0:
-                json_str = response_text[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                # Fallback to basic parsing
-                return {
-                    'recommended_doctor': 'General Practitioner',
-                    'recommended_time': 'Next available',
-                    'urgency_level': 'medium',
-                    'reasoning': 'Standard recommendation',
-                    'alternative_options': []
-                }
-                
-        except json.JSONDecodeError:
-            return {
-                'recommended_doctor': 'General Practitioner',
-                'recommended_time': 'Next available',
-                'urgency_level': 'medium',
-                'reasoning': 'Standard recommendation',
-                'alternative_options': []
-            }
+        # Decode the first valid JSON object in the response, skipping any prose around it
+        idx = response_text.find('{')
+        while idx != -1:
+            try:
+                parsed, _ = _JSON_DECODER.raw_decode(response_text, idx)
+                if isinstance(parsed, dict):
+                    return parsed
+            except json.JSONDecodeError:
+                pass
+            idx = response_text.find('{', idx + 1)
+        
+        # Fallback to basic parsing
+        return {
+            'recommended_doctor': 'General Practitioner',
+            'recommended_time': 'Next available',
+            'urgency_level': 'medium',
+            'reasoning': 'Standard recommendation',
+            'alternative_options': []
+        }
     
     def _add_smart_features(self, patient_request: str, recommendations: Dict[str, Any]) -> Dict[str, Any]:
         """Add additional smart features to recommendations"""
@@ -335,34 +513,25 @@ class SmartSchedulingEngine:
             'health_tips': self._get_relevant_health_tips(patient_request)
         }
     
-    def _calculate_time_score(self, date: date, time_str: str, preferences: Dict[str, Any]) -> float:
-        """Calculate a score for how optimal a time slot is"""
-        score = 50.0  # Base score
+    def _calculate_time_scores(self, day_of_week: np.ndarray, hour: np.ndarray, days_from_now: np.ndarray, urgent: bool) -> np.ndarray:
+        """Calculate how optimal each time slot is, for arrays of slots (weekday 0 = Monday, hour, days from today)"""
+        scores = np.full(day_of_week.size, 50.0)  # Base score
         
         # Day of week preferences
-        day_of_week = date.weekday()  # 0 = Monday, 6 = Sunday
-        if day_of_week < 5:  # Weekday
-            score += 10
+        scores += np.where(day_of_week < 5, 10, 0)  # Weekday
         
         # Time of day preferences
-        hour = int(time_str.split(':')[0])
-        if 9 <= hour <= 11:  # Morning preferred
-            score += 15
-        elif 14 <= hour <= 16:  # Afternoon
-            score += 10
+        scores += np.where((hour >= 9) & (hour <= 11), 15,  # Morning preferred
+                           np.where((hour >= 14) & (hour <= 16), 10, 0))  # Afternoon
         
-        # Urgency factor
-        urgency = preferences.get('urgency', 'medium')
-        if urgency == 'high':
-            # Prefer earlier dates
-            days_from_now = (date - datetime.now().date()).days
-            score += max(0, 20 - days_from_now)
+        # Urgency factor: prefer earlier dates
+        if urgent:
+            scores += np.maximum(0, 20 - days_from_now)
         
         # Avoid Mondays and Fridays if possible (typically busier)
-        if day_of_week in [0, 4]:
-            score -= 5
+        scores -= np.where((day_of_week == 0) | (day_of_week == 4), 5, 0)
         
-        return score
+        return scores
     
     def _get_score_reasons(self, date: date, time_str: str, score: float) -> List[str]:
         """Get reasons for the time slot score"""
@@ -391,11 +560,9 @@ class SmartSchedulingEngine:
     
     def _analyze_rescheduling_urgency(self, reason: str) -> str:
         """Analyze the urgency of rescheduling based on reason"""
-        reason_lower = reason.lower()
-        
-        if any(word in reason_lower for word in ['emergency', 'urgent', 'pain', 'severe']):
+        if _RESCHEDULE_URGENT_RE.search(reason):
             return 'high'
-        elif any(word in reason_lower for word in ['conflict', 'work', 'travel']):
+        elif _RESCHEDULE_CONFLICT_RE.search(reason):
             return 'medium'
         else:
             return 'low'
@@ -435,20 +602,20 @@ class SmartSchedulingEngine:
         
         return recommendations
     
-    def _calculate_appointment_priority(self, appointment: Appointment) -> float:
+    def _calculate_appointment_priority(self, appointment: Appointment, now: Optional[datetime] = None) -> float:
         """Calculate priority score for an appointment"""
+        now = now or datetime.now()
         score = 50.0  # Base score
         
         # Check urgency based on notes
         if appointment.notes:
-            notes_lower = appointment.notes.lower()
-            if any(word in notes_lower for word in ['urgent', 'emergency', 'pain']):
+            if _PRIORITY_URGENT_RE.search(appointment.notes):
                 score += 30
-            elif any(word in notes_lower for word in ['follow-up', 'routine']):
+            elif _PRIORITY_ROUTINE_RE.search(appointment.notes):
                 score += 10
         
         # Consider appointment age (how long ago it was scheduled)
-        days_scheduled = (datetime.now() - appointment.created_at).days
+        days_scheduled = (now - appointment.created_at).days
         if days_scheduled > 7:
             score += 10  # Older appointments get slight priority
         
@@ -458,21 +625,21 @@ class SmartSchedulingEngine:
         
         return score
     
-    def _get_priority_factors(self, appointment: Appointment) -> List[str]:
+    def _get_priority_factors(self, appointment: Appointment, now: Optional[datetime] = None) -> List[str]:
         """Get factors that influence appointment priority"""
+        now = now or datetime.now()
         factors = []
         
         if appointment.notes:
-            notes_lower = appointment.notes.lower()
-            if any(word in notes_lower for word in ['urgent', 'emergency']):
+            if _URGENT_CONDITION_RE.search(appointment.notes):
                 factors.append("Urgent medical condition")
-            if any(word in notes_lower for word in ['follow-up']):
+            if _FOLLOW_UP_RE.search(appointment.notes):
                 factors.append("Follow-up appointment")
         
         if appointment.department.lower() in ['emergency', 'cardiology', 'oncology']:
             factors.append("Critical care department")
         
-        days_scheduled = (datetime.now() - appointment.created_at).days
+        days_scheduled = (now - appointment.created_at).days
         if days_scheduled > 7:
             factors.append("Long-standing appointment")
         
@@ -519,44 +686,45 @@ class SmartSchedulingEngine:
         if not appointments:
             return {}
         
+        return self._analyze_pattern_columns(
+            np.array([apt['appointment_date'] for apt in appointments], dtype='datetime64[D]'),
+            [apt['department'] for apt in appointments],
+            np.asarray([int(apt['appointment_time'].split(':')[0]) for apt in appointments])
+        )
+    
+    def _analyze_pattern_columns(self, appointment_dates: np.ndarray, departments: List[str], hours: np.ndarray) -> Dict[str, Any]:
+        """Analyze appointment patterns from column arrays (dates, departments, hours)"""
         # Analyze frequency
-        appointment_dates = [datetime.strptime(apt['appointment_date'], '%Y-%m-%d') for apt in appointments]
-        appointment_dates.sort()
+        appointment_dates = np.sort(appointment_dates)
         
         # Calculate average interval
-        if len(appointment_dates) > 1:
-            intervals = [(appointment_dates[i] - appointment_dates[i-1]).days for i in range(1, len(appointment_dates))]
-            avg_interval = sum(intervals) / len(intervals)
+        if appointment_dates.size > 1:
+            intervals = np.diff(appointment_dates).astype(int)
+            avg_interval = float(intervals.mean())
         else:
             avg_interval = None
         
         # Analyze departments
-        departments = [apt['department'] for apt in appointments]
-        department_frequency = {}
-        for dept in departments:
-            department_frequency[dept] = department_frequency.get(dept, 0) + 1
+        department_frequency = Counter(departments)
         
         # Analyze time preferences
-        times = [apt['appointment_time'] for apt in appointments]
-        morning_count = sum(1 for t in times if int(t.split(':')[0]) < 12)
-        afternoon_count = len(times) - morning_count
+        morning_count = int((hours < 12).sum())
+        afternoon_count = hours.size - morning_count
         
         return {
-            'total_appointments': len(appointments),
+            'total_appointments': len(departments),
             'average_interval_days': avg_interval,
-            'department_frequency': department_frequency,
+            'department_frequency': dict(department_frequency),
             'time_preference': 'morning' if morning_count > afternoon_count else 'afternoon',
-            'most_visited_department': max(department_frequency.items(), key=lambda x: x[1])[0] if department_frequency else None
+            'most_visited_department': department_frequency.most_common(1)[0][0] if department_frequency else None
         }
     
-    def _predict_future_appointments(self, patterns: Dict[str, Any], patient_history: Dict[str, Any]) -> Dict[str, Any]:
+    def _predict_future_appointments(self, patterns: Dict[str, Any], last_date: Optional[date]) -> Dict[str, Any]:
         """Predict future appointment needs"""
         predictions = {}
         
         if patterns.get('average_interval_days'):
-            last_appointment = patient_history.get('last_appointment')
-            if last_appointment:
-                last_date = datetime.strptime(last_appointment['appointment_date'], '%Y-%m-%d')
+            if last_date:
                 predicted_next_date = last_date + timedelta(days=patterns['average_interval_days'])
                 predictions['next_appointment_date'] = predicted_next_date.strftime('%Y-%m-%d')
         
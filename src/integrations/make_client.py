@@ -2,10 +2,61 @@
 Make.ai Integration Client for Hospital Appointment Scheduler
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from typing import Dict, Any, Optional
-from datetime import datetime
+import orjson
+import random
+import hashlib
+import asyncio
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
 import os
+from cachetools import TTLCache
+from src.integrations.make_client_async import AsyncMakeClient, run_on_background_loop
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+_CALLBACK_URL = f"{os.getenv('APP_BASE_URL', 'http://localhost:5000')}/api/notifications/callback"
+
+# Appointment fields copied into every appointment notification
+_APPOINTMENT_FIELDS = ('patient_name', 'patient_phone', 'patient_email', 'doctor_name', 'appointment_date', 'appointment_time')
+
+def _utc_timestamp() -> str:
+    """Current UTC time as an ISO 8601 string with second precision"""
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+class _JitteredRetry(Retry):
+    """
+    urllib3 Retry with random jitter on top of the exponential backoff.
+    
+    Webhook POSTs aren't idempotent, so they are only retried when the request
+    never reached Make.ai (connect errors, retried for any method) or was
+    refused with 429; a 5xx or read timeout may already have sent the notification.
+    """
+    
+    max_delay = float(os.getenv('MAKE_RETRY_MAX_DELAY', '30'))
+    
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method == 'POST':
+            return status_code == 429
+        return super().is_retry(method, status_code, has_retry_after)
+    
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if not backoff:
+            return 0
+        return min(self.max_delay, backoff + random.uniform(0, backoff))
 
 class MakeClient:
     """Client for integrating with Make.ai workflow automation"""
@@ -14,33 +65,92 @@ class MakeClient:
         self.make_webhook_url = make_webhook_url or os.getenv('MAKE_WEBHOOK_URL', 'https://hook.make.com/your-webhook-id')
         self.api_key = os.getenv('MAKE_API_KEY')
         self.base_url = os.getenv('MAKE_BASE_URL', 'https://api.make.com')
+        self._source = 'hospital_scheduler'
         
+        # Pooled keep-alive session shared by all Make.ai calls from this client
+        self._session = requests.Session()
+        retry = _JitteredRetry(
+            total=int(os.getenv('MAKE_RETRY_MAX', '5')),
+            backoff_factor=float(os.getenv('MAKE_RETRY_BACKOFF', '0.5')),
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET'}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers.update({
+            'Content-Type': 'application/json',
+            'User-Agent': 'HospitalScheduler/1.0'
+        })
+        
+        # Short-lived cache for the idempotent scenario GETs polled by dashboards
+        self._scenario_cache = TTLCache(maxsize=512, ttl=int(os.getenv('MAKE_CACHE_TTL', '15')))
+        self._scenario_cache_lock = threading.RLock()
+        
+        # Single-flight map of webhook calls currently in progress, by payload hash
+        self._inflight: Dict[bytes, Future] = {}
+        self._inflight_lock = threading.Lock()
+    
+    def close(self):
+        """Close pooled HTTP connections"""
+        self._session.close()
+        
+    def _build_payload(self, notification_data: Dict[str, Any], timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """Build the Make.ai webhook payload for a notification"""
+        return {
+            'notification_type': notification_data.get('type', 'confirmation'),
+            'patient_name': notification_data.get('patient_name'),
+            'patient_phone': notification_data.get('patient_phone'),
+            'patient_email': notification_data.get('patient_email'),
+            'doctor_name': notification_data.get('doctor_name'),
+            'appointment_date': notification_data.get('appointment_date'),
+            'appointment_time': notification_data.get('appointment_time'),
+            'hospital_name': notification_data.get('hospital_name', 'City General Hospital'),
+            'callback_url': notification_data.get('callback_url'),
+            'timestamp': timestamp or _utc_timestamp(),
+            'source': self._source
+        }
+    
     def trigger_notification_workflow(self, notification_data: Dict[str, Any]) -> Dict[str, Any]:
         """Trigger the appointment notification workflow via Make.ai webhook"""
+        # Prepare notification payload for Make.ai
+        payload = self._build_payload(notification_data)
+        
+        # Identical notifications already in flight share that call's result
+        key = hashlib.blake2b(
+            json.dumps({k: v for k, v in payload.items() if k != 'timestamp'}, sort_keys=True, default=str).encode(),
+            digest_size=16
+        ).digest()
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._inflight[key] = Future()
+        
+        if not is_leader:
+            return dict(future.result())
+        
+        try:
+            result = self._post_notification(payload)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def _post_notification(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a prepared payload to the Make.ai webhook"""
         try:
-            # Prepare notification payload for Make.ai
-            payload = {
-                'notification_type': notification_data.get('type', 'confirmation'),
-                'patient_name': notification_data.get('patient_name'),
-                'patient_phone': notification_data.get('patient_phone'),
-                'patient_email': notification_data.get('patient_email'),
-                'doctor_name': notification_data.get('doctor_name'),
-                'appointment_date': notification_data.get('appointment_date'),
-                'appointment_time': notification_data.get('appointment_time'),
-                'hospital_name': notification_data.get('hospital_name', 'City General Hospital'),
-                'callback_url': notification_data.get('callback_url'),
-                'timestamp': datetime.now().isoformat(),
-                'source': 'hospital_scheduler'
-            }
-            
             # Send webhook request to Make.ai
-            response = requests.post(
+            response = self._session.post(
                 self.make_webhook_url,
                 json=payload,
-                headers={
-                    'Content-Type': 'application/json',
-                    'User-Agent': 'HospitalScheduler/1.0'
-                },
                 timeout=30
             )
             
@@ -48,7 +158,8 @@ class MakeClient:
                 return {
                     'success': True,
                     'message': 'Make.ai notification workflow triggered successfully',
-                    'response': response.json() if response.content else {},
+                    # orjson straight from bytes skips requests' charset detection
+                    'response': orjson.loads(response.content) if response.content else {},
                     'execution_id': response.headers.get('X-Make-Execution-Id')
                 }
             else:
@@ -69,50 +180,60 @@ class MakeClient:
                 'error': f'Unexpected error: {str(e)}'
             }
     
+    def _send(self, kind: str, appointment_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Send an appointment notification of the given kind"""
+        return self.trigger_notification_workflow({
+            'type': kind,
+            'callback_url': _CALLBACK_URL,
+            **{field: appointment_data.get(field) for field in _APPOINTMENT_FIELDS}
+        })
+    
     def send_appointment_confirmation(self, appointment_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send appointment confirmation notification via Make.ai"""
-        notification_data = {
-            'type': 'confirmation',
-            'patient_name': appointment_data.get('patient_name'),
-            'patient_phone': appointment_data.get('patient_phone'),
-            'patient_email': appointment_data.get('patient_email'),
-            'doctor_name': appointment_data.get('doctor_name'),
-            'appointment_date': appointment_data.get('appointment_date'),
-            'appointment_time': appointment_data.get('appointment_time'),
-            'callback_url': f"{os.getenv('APP_BASE_URL', 'http://localhost:5000')}/api/notifications/callback"
-        }
-        
-        return self.trigger_notification_workflow(notification_data)
+        return self._send('confirmation', appointment_data)
     
     def send_appointment_reminder(self, appointment_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send appointment reminder notification via Make.ai"""
-        notification_data = {
-            'type': 'reminder',
-            'patient_name': appointment_data.get('patient_name'),
-            'patient_phone': appointment_data.get('patient_phone'),
-            'patient_email': appointment_data.get('patient_email'),
-            'doctor_name': appointment_data.get('doctor_name'),
-            'appointment_date': appointment_data.get('appointment_date'),
-            'appointment_time': appointment_data.get('appointment_time'),
-            'callback_url': f"{os.getenv('APP_BASE_URL', 'http://localhost:5000')}/api/notifications/callback"
-        }
-        
-        return self.trigger_notification_workflow(notification_data)
+        return self._send('reminder', appointment_data)
     
     def send_appointment_cancellation(self, appointment_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send appointment cancellation notification via Make.ai"""
-        notification_data = {
-            'type': 'cancellation',
-            'patient_name': appointment_data.get('patient_name'),
-            'patient_phone': appointment_data.get('patient_phone'),
-            'patient_email': appointment_data.get('patient_email'),
-            'doctor_name': appointment_data.get('doctor_name'),
-            'appointment_date': appointment_data.get('appointment_date'),
-            'appointment_time': appointment_data.get('appointment_time'),
-            'callback_url': f"{os.getenv('APP_BASE_URL', 'http://localhost:5000')}/api/notifications/callback"
-        }
+        return self._send('cancellation', appointment_data)
+    
+    def _cached_get(self, url: str, params: Optional[Dict[str, str]] = None) -> Tuple[int, Any]:
+        """GET a Make.ai API resource, serving repeat calls from the TTL cache"""
+        key = ('GET', url, frozenset((params or {}).items()))
+        with self._scenario_cache_lock:
+            cached = self._scenario_cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return 200, cached
         
-        return self.trigger_notification_workflow(notification_data)
+        response = self._session.get(
+            url,
+            headers={'Authorization': f'Token {self.api_key}'},
+            params=params,
+            timeout=10
+        )
+        if response.status_code != 200:
+            return response.status_code, None
+        
+        data = response.json()
+        with self._scenario_cache_lock:
+            self._scenario_cache[key] = data
+        return 200, data
+    
+    def invalidate(self, scenario_id: Optional[str] = None):
+        """Drop cached scenario lookups for one scenario (and the active list), or all of them"""
+        with self._scenario_cache_lock:
+            if scenario_id is None:
+                self._scenario_cache.clear()
+                return
+            
+            scenario_path = f"/v2/scenarios/{scenario_id}/"
+            list_url = f"{self.base_url}/v2/scenarios"
+            for key in list(self._scenario_cache.keys()):
+                if scenario_path in key[1] or key[1] == list_url:
+                    self._scenario_cache.pop(key, None)
     
     def get_scenario_status(self, scenario_id: str) -> Dict[str, Any]:
         """Get the status of a Make.ai scenario execution"""
@@ -123,26 +244,17 @@ class MakeClient:
                     'error': 'Make.ai API key not configured'
                 }
             
-            headers = {
-                'Authorization': f'Token {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(
-                f"{self.base_url}/v2/scenarios/{scenario_id}/executions",
-                headers=headers,
-                timeout=10
-            )
+            status_code, data = self._cached_get(f"{self.base_url}/v2/scenarios/{scenario_id}/executions")
             
-            if response.status_code == 200:
+            if status_code == 200:
                 return {
                     'success': True,
-                    'scenario_status': response.json()
+                    'scenario_status': data
                 }
             else:
                 return {
                     'success': False,
-                    'error': f'Failed to get scenario status: {response.status_code}'
+                    'error': f'Failed to get scenario status: {status_code}'
                 }
                 
         except Exception as e:
@@ -160,27 +272,17 @@ class MakeClient:
                     'error': 'Make.ai API key not configured'
                 }
             
-            headers = {
-                'Authorization': f'Token {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(
-                f"{self.base_url}/v2/scenarios",
-                headers=headers,
-                params={'filter[active]': 'true'},
-                timeout=10
-            )
+            status_code, data = self._cached_get(f"{self.base_url}/v2/scenarios", params={'filter[active]': 'true'})
             
-            if response.status_code == 200:
+            if status_code == 200:
                 return {
                     'success': True,
-                    'scenarios': response.json()
+                    'scenarios': data
                 }
             else:
                 return {
                     'success': False,
-                    'error': f'Failed to list scenarios: {response.status_code}'
+                    'error': f'Failed to list scenarios: {status_code}'
                 }
                 
         except Exception as e:
@@ -212,12 +314,66 @@ class MakeClient:
         
         return self.trigger_notification_workflow(notification_data)
 
+# Shared pool for notifications sent without blocking the request thread
+_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv('NOTIF_POOL', '16')), thread_name_prefix='notif')
+
+# Notification history lives next to the app database unless overridden
+NOTIFICATIONS_DB_PATH = os.getenv(
+    'NOTIF_DB_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'hospital_scheduler.db')
+)
+HISTORY_FLUSH_INTERVAL = 0.1
+HISTORY_BATCH_MAX = 128
+# Longest wait between retries of a history batch that failed to commit
+HISTORY_RETRY_MAX_DELAY = 5.0
+# How long readers (and interpreter exit) wait for queued history rows to be written
+HISTORY_FLUSH_TIMEOUT = 5.0
+
+def _connect_history_db() -> sqlite3.Connection:
+    """Open the history database, creating the notifications table if needed"""
+    os.makedirs(os.path.dirname(NOTIFICATIONS_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(NOTIFICATIONS_DB_PATH, timeout=10, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY,
+            type TEXT,
+            appointment_id TEXT,
+            appointment_json TEXT,
+            result_json TEXT,
+            created_at TEXT
+        )
+    """)
+    return conn
+
+# Appointment fields kept in notification history entries
+_HISTORY_FIELDS = ('patient_name', 'doctor_name', 'appointment_date', 'appointment_time')
+
+def _history_summary(appointment_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce appointment data to the few fields worth retaining in history"""
+    return {field: appointment_data.get(field) for field in _HISTORY_FIELDS}
+
 class NotificationAgent:
     """Agent for handling notifications through Make.ai workflows"""
     
     def __init__(self):
         self.make_client = MakeClient()
-        self.notification_history = []
+        self.async_make_client = AsyncMakeClient(self.make_client)
+        
+        # History goes to SQLite through a background writer so every worker shares it;
+        # _pending counts rows queued but not yet committed, so readers can wait for them
+        self._q = queue.Queue()
+        self._pending = 0
+        self._pending_cv = threading.Condition()
+        threading.Thread(target=self._writer, name='notif-history-writer', daemon=True).start()
+        atexit.register(self.flush_history)
+        
+        # One reader connection for get_notification_history, opened on first use
+        self._reader: Optional[sqlite3.Connection] = None
+        self._reader_lock = threading.Lock()
+        
+        # Futures for notifications handed to the background pool, by task id
+        self._futures = TTLCache(maxsize=1024, ttl=600)
+        self._futures_lock = threading.Lock()
     
     def send_notification(self, notification_type: str, appointment_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send notification based on type using Make.ai"""
@@ -235,12 +391,7 @@ class NotificationAgent:
                 }
             
             # Log notification attempt
-            self.notification_history.append({
-                'type': notification_type,
-                'appointment_data': appointment_data,
-                'result': result,
-                'timestamp': datetime.now().isoformat()
-            })
+            self._record(notification_type, appointment_data, result, datetime.now().isoformat())
             
             return result
             
@@ -250,9 +401,127 @@ class NotificationAgent:
                 'error': f'Error sending notification: {str(e)}'
             }
     
+    def send_notification_async(self, notification_type: str, appointment_data: Dict[str, Any],
+                                on_done: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> str:
+        """Send a notification on the background pool and return a task id immediately"""
+        task_id = uuid.uuid4().hex
+        future = _EXECUTOR.submit(self.send_notification, notification_type, appointment_data)
+        with self._futures_lock:
+            self._futures[task_id] = future
+        
+        # on_done(task_id, result) runs on the pool thread, e.g. to emit a SocketIO event;
+        # callers without one poll get_notification_result(task_id)
+        if on_done is not None:
+            future.add_done_callback(lambda f: on_done(task_id, f.result()))
+        
+        return task_id
+    
+    def get_notification_result(self, task_id: str) -> Dict[str, Any]:
+        """Get the result of a notification sent with send_notification_async"""
+        with self._futures_lock:
+            future = self._futures.get(task_id)
+        
+        if future is None:
+            return {'success': False, 'error': f'Unknown notification task: {task_id}'}
+        if not future.done():
+            return {'success': True, 'status': 'pending', 'task_id': task_id}
+        return {**future.result(), 'status': 'done', 'task_id': task_id}
+    
+    def send_batch(self, notifications: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Trigger many notification workflows concurrently and return their results in order"""
+        results = run_on_background_loop(self._send_batch(notifications))
+        
+        timestamp = datetime.now().isoformat()
+        for notification_data, result in zip(notifications, results):
+            self._record(notification_data.get('type', 'confirmation'), notification_data, result, timestamp)
+        
+        return results
+    
+    async def _send_batch(self, notifications: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # One timestamp for the whole batch
+        timestamp = _utc_timestamp()
+        return await asyncio.gather(
+            *(self.async_make_client.trigger_notification_workflow(n, timestamp) for n in notifications)
+        )
+    
+    def _record(self, notification_type: str, appointment_data: Dict[str, Any], result: Dict[str, Any], timestamp: str):
+        """Queue a notification history row for the background writer"""
+        with self._pending_cv:
+            self._pending += 1
+        self._q.put((
+            notification_type,
+            appointment_data.get('appointment_id'),
+            orjson.dumps(_history_summary(appointment_data), default=str).decode(),
+            orjson.dumps(result, default=str).decode(),
+            timestamp
+        ))
+    
+    def _writer(self):
+        """Drain queued history rows and insert them in batched transactions"""
+        conn = None
+        batch = []
+        retry_delay = HISTORY_FLUSH_INTERVAL
+        while True:
+            if not batch:
+                batch.append(self._q.get())
+            # Let a burst accumulate so one commit covers it
+            time.sleep(HISTORY_FLUSH_INTERVAL)
+            while len(batch) < HISTORY_BATCH_MAX:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                if conn is None:
+                    conn = _connect_history_db()
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO notifications (type, appointment_id, appointment_json, result_json, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        batch
+                    )
+            except sqlite3.Error as e:
+                # Keep the batch and retry it (with anything queued since) after a backoff
+                logger.error(f"Could not persist notification history, retrying {len(batch)} rows: {str(e)}")
+                time.sleep(retry_delay)
+                retry_delay = min(HISTORY_RETRY_MAX_DELAY, retry_delay * 2)
+                continue
+            
+            with self._pending_cv:
+                self._pending -= len(batch)
+                self._pending_cv.notify_all()
+            batch = []
+            retry_delay = HISTORY_FLUSH_INTERVAL
+    
+    def flush_history(self, timeout: float = HISTORY_FLUSH_TIMEOUT) -> bool:
+        """Wait until every queued history row is committed; False if the timeout ran out first"""
+        with self._pending_cv:
+            return self._pending_cv.wait_for(lambda: self._pending == 0, timeout)
+    
     def get_notification_history(self, limit: int = 50) -> list:
         """Get recent notification history"""
-        return self.notification_history[-limit:]
+        # Include notifications that were just sent
+        if not self.flush_history():
+            logger.warning("Notification history may be missing rows that are still queued")
+        
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = _connect_history_db()
+            rows = self._reader.execute(
+                "SELECT type, appointment_json, result_json, created_at FROM notifications ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        
+        return [
+            {
+                'type': notification_type,
+                'appointment_data': orjson.loads(appointment_json),
+                'result': orjson.loads(result_json),
+                'timestamp': created_at
+            }
+            for notification_type, appointment_json, result_json, created_at in reversed(rows)
+        ]
     
     def schedule_reminder(self, appointment_data: Dict[str, Any], reminder_time: datetime) -> Dict[str, Any]:
         """Schedule a reminder notification via Make.ai"""
@@ -0,0 +1,88 @@
+"""
+Async Make.ai webhook client for concurrent notification fan-out
+"""
+import asyncio
+import threading
+from typing import Dict, Any, Optional
+
+import aiohttp
+import orjson
+
+# Background event loop shared by all async Make.ai calls made from Flask threads
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Start the background event loop thread on first use"""
+    global _LOOP
+    if _LOOP is not None:
+        return _LOOP
+    
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='make-async-loop', daemon=True).start()
+            _LOOP = loop
+    return _LOOP
+
+def run_on_background_loop(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the background loop from synchronous code and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result(timeout)
+
+class AsyncMakeClient:
+    """aiohttp-based counterpart of MakeClient for the webhook path"""
+    
+    def __init__(self, make_client):
+        # Reuses the sync client's webhook URL and payload building
+        self.make_client = make_client
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session binds to the loop it is used on
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=64, keepalive_timeout=75),
+                headers={'User-Agent': 'HospitalScheduler/1.0'}
+            )
+        return self._session
+    
+    async def trigger_notification_workflow(self, notification_data: Dict[str, Any], timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """Trigger the appointment notification workflow via Make.ai webhook"""
+        try:
+            payload = self.make_client._build_payload(notification_data, timestamp)
+            
+            async with self._get_session().post(
+                self.make_client.make_webhook_url,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                if response.status in [200, 201, 202]:
+                    content = await response.read()
+                    return {
+                        'success': True,
+                        'message': 'Make.ai notification workflow triggered successfully',
+                        'response': orjson.loads(content) if content else {},
+                        'execution_id': response.headers.get('X-Make-Execution-Id')
+                    }
+                else:
+                    return {
+                        'success': False,
+                        'error': f'Make.ai webhook request failed with status {response.status}',
+                        'response': await response.text()
+                    }
+                    
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return {
+                'success': False,
+                'error': f'Network error: {str(e)}'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Unexpected error: {str(e)}'
+            }
+    
+    async def close(self):
+        """Close pooled HTTP connections"""
+        if self._session is not None:
+            await self._session.close()
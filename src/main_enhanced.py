@@ -7,47 +7,107 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+# SocketIO stays on the threading async mode in every environment: the dashboard
+# and Make.ai clients run real asyncio loops on background threads, which
+# eventlet/gevent monkey-patching does not support
+PRODUCTION = os.getenv('PROD') == '1'
+
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-from flask_socketio import SocketIO
+from flask_compress import Compress
+from flask_socketio import SocketIO, emit
 import json
+import decimal
+import orjson
 from datetime import datetime
 import sqlite3
 import asyncio
+import hashlib
+import functools
+import threading
 import logging
+from cachetools import TTLCache
 
 # Import routes
 from src.routes.appointment import appointment_bp
 from src.routes.voice import voice_bp
 
 # Import dashboards
-from src.dashboard.user_dashboard import user_dashboard, init_socketio_events
+from src.dashboard.user_dashboard import user_dashboard, init_socketio_events, release_user_connection
 from src.dashboard.doctor_dashboard import doctor_dashboard, init_doctor_socketio_events
 
-# Import agents
-try:
-    from src.agents.langchain_mcp_agent import get_hospital_agent
-    MCP_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: MCP agent not available: {e}")
-    MCP_AVAILABLE = False
+# Import agents on first use; LangChain/MCP are slow to import and most routes never touch them
+@functools.lru_cache(maxsize=1)
+def _get_agent_factory():
+    """Return get_hospital_agent, or None if the MCP agent cannot be imported"""
+    try:
+        from src.agents.langchain_mcp_agent import get_hospital_agent
+    except ImportError as e:
+        print(f"Warning: MCP agent not available: {e}")
+        return None
+    return get_hospital_agent
+
+def _mcp_available() -> bool:
+    return _get_agent_factory() is not None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj,
+            default=_orjson_default,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        ).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+def _orjson_default(obj):
+    # Types Flask's default provider handles that orjson does not
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class OrjsonSIO:
+    """orjson-backed json module for SocketIO/Engine.IO packet encoding"""
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(
+            obj,
+            default=_orjson_default,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+app.json = OrjsonProvider(app)
 CORS(app, origins="*")
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'hospital-scheduler-secret-key-2025')
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'hospital_scheduler.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html', 'text/css', 'application/javascript']
+app.config['COMPRESS_LEVEL'] = 5
+app.config['COMPRESS_MIN_SIZE'] = 512
+
+DEBUG = os.getenv('FLASK_DEBUG', '0') == '1'
 
 # Initialize extensions
-db = SQLAlchemy(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+Compress(app)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', json=OrjsonSIO)
 
 # Register blueprints
 app.register_blueprint(appointment_bp, url_prefix='/api/appointments')
@@ -59,6 +119,57 @@ app.register_blueprint(doctor_dashboard, url_prefix='/')
 init_socketio_events(socketio)
 init_doctor_socketio_events(socketio)
 
+DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'hospital_scheduler.db')
+
+# One long-lived autocommit connection per thread for the request handlers
+_db_local = threading.local()
+
+# The database is created and seeded on first access rather than at startup
+_db_ready = threading.Event()
+_db_init_lock = threading.Lock()
+
+def ensure_db():
+    """Run init_database once per process, on first use"""
+    if _db_ready.is_set():
+        return
+    with _db_init_lock:
+        if not _db_ready.is_set():
+            init_database()
+            _db_ready.set()
+
+def _get_conn() -> sqlite3.Connection:
+    """Get this thread's SQLite connection, opening it in WAL mode on first use"""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        ensure_db()
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-20000")
+        _db_local.conn = conn
+    return conn
+
+def _scan_static_paths(folder):
+    """Collect every file under the static folder as a relative '/'-separated path"""
+    paths = set()
+    if not folder or not os.path.isdir(folder):
+        return frozenset(paths)
+    
+    pending = [(folder, '')]
+    while pending:
+        directory, prefix = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                rel = f"{prefix}{entry.name}"
+                if entry.is_dir():
+                    pending.append((entry.path, f"{rel}/"))
+                else:
+                    paths.add(rel)
+    return frozenset(paths)
+
+# Static files are fixed once deployed, so serve() dispatches on a set lookup
+_STATIC_PATHS = _scan_static_paths(app.static_folder)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -67,21 +178,28 @@ def serve(path):
     if static_folder_path is None:
         return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+    if path and path in _STATIC_PATHS:
         return send_from_directory(static_folder_path, path)
     else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
+        if 'index.html' in _STATIC_PATHS:
             return send_from_directory(static_folder_path, 'index.html')
         else:
             return "index.html not found", 404
 
-@app.route('/health')
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
+# Unauthenticated, so only exposed when running with FLASK_DEBUG=1
+if DEBUG and not PRODUCTION:
+    @app.route('/api/admin/reload-static', methods=['POST'])
+    def reload_static():
+        """Rescan the static folder after files change (development)"""
+        global _STATIC_PATHS
+        _STATIC_PATHS = _scan_static_paths(app.static_folder)
+        return jsonify({"success": True, "files": len(_STATIC_PATHS)})
+
+# Static part of the health response, built on the first health check
+@functools.lru_cache(maxsize=1)
+def _health_info():
+    return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
         "service": "Hospital Appointment Scheduler",
         "version": "2.0.0",
         "features": [
@@ -90,53 +208,112 @@ def health_check():
             "Dynamic Alerts",
             "Email & WhatsApp Integration",
             "User & Doctor Dashboards",
-            "MCP Multi-Agent Architecture" if MCP_AVAILABLE else "Basic Architecture"
+            "MCP Multi-Agent Architecture" if _mcp_available() else "Basic Architecture"
         ]
-    })
+    }
+
+@app.route('/health')
+def health_check():
+    """Health check endpoint"""
+    return jsonify({**_health_info(), "timestamp": datetime.now().isoformat()})
+
+# Status JSON is reused for a couple of seconds to absorb dashboard polling
+_status_cache = TTLCache(maxsize=1, ttl=2)
+_status_cache_lock = threading.Lock()
+
+def _build_status():
+    """Assemble the system status snapshot"""
+    mcp_available = _mcp_available()
+    
+    # Row counts are kept in the counters table by triggers on doctors and appointments
+    try:
+        counts = dict(_get_conn().execute("SELECT name, n FROM counters").fetchall())
+    except sqlite3.Error:
+        counts = {}
+    
+    return {
+        "status": "operational",
+        "database": "connected",
+        "doctors": counts.get('doctors', 0),
+        "appointments": counts.get('appointments', 0),
+        "mcp_server": "running" if mcp_available else "not_available",
+        "agents": {
+            "appointment_agent": "active" if mcp_available else "basic",
+            "voice_agent": "active",
+            "gmail_agent": "active" if mcp_available else "simulated",
+            "whatsapp_agent": "active" if mcp_available else "simulated",
+            "alerts_agent": "active"
+        },
+        "timestamp": datetime.now().isoformat()
+    }
+
+def _status_response(body):
+    response = Response(body, mimetype='application/json')
+    response.cache_control.max_age = 5
+    return response
+
+# Counts in the last snapshot pushed to /status subscribers
+_published_counts = None
+
+def _publish_status():
+    """Push a fresh status snapshot to /status subscribers and refresh the cached body"""
+    global _published_counts
+    status = _build_status()
+    _published_counts = (status['doctors'], status['appointments'])
+    with _status_cache_lock:
+        _status_cache['status'] = app.json.dumps(status).encode()
+    socketio.emit('system_status', status, namespace='/status')
+
+# Writers outside this module (SQLAlchemy routes, agents, the MCP server) don't call
+# _publish_status, so a background task watches the database for commits and
+# publishes whenever the counters have moved since the last push
+STATUS_WATCH_INTERVAL = float(os.getenv('STATUS_WATCH_INTERVAL', '1'))
+_status_watcher_started = False
+_status_watcher_lock = threading.Lock()
+
+def _watch_status():
+    """Publish the status when another connection's commit changes the row counts"""
+    global _published_counts
+    conn = _get_conn()
+    last_version = None
+    while True:
+        try:
+            # data_version changes only when some other connection commits
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != last_version:
+                last_version = version
+                counts = dict(conn.execute("SELECT name, n FROM counters").fetchall())
+                counts = (counts.get('doctors', 0), counts.get('appointments', 0))
+                if _published_counts is None:
+                    # Subscribers were just sent a fresh snapshot
+                    _published_counts = counts
+                elif counts != _published_counts:
+                    _publish_status()
+        except sqlite3.Error as e:
+            logger.warning(f"Status watcher could not read counters: {str(e)}")
+        socketio.sleep(STATUS_WATCH_INTERVAL)
+
+def _start_status_watcher():
+    """Start the status watcher once, when the first client subscribes"""
+    global _status_watcher_started
+    with _status_watcher_lock:
+        if not _status_watcher_started:
+            socketio.start_background_task(_watch_status)
+            _status_watcher_started = True
 
 @app.route('/api/system/status')
 def system_status():
-    """System status endpoint"""
+    """System status endpoint (polling fallback for the /status SocketIO push)"""
+    with _status_cache_lock:
+        body = _status_cache.get('status')
+    if body is not None:
+        return _status_response(body)
+    
     try:
-        # Check database connection
-        db_path = os.path.join(os.path.dirname(__file__), 'database', 'hospital_scheduler.db')
-        
-        if not os.path.exists(db_path):
-            # Initialize database if it doesn't exist
-            init_database()
-        
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("SELECT COUNT(*) FROM doctors")
-            doctor_count = cursor.fetchone()[0]
-        except:
-            doctor_count = 0
-            
-        try:
-            cursor.execute("SELECT COUNT(*) FROM appointments")
-            appointment_count = cursor.fetchone()[0]
-        except:
-            appointment_count = 0
-            
-        conn.close()
-        
-        return jsonify({
-            "status": "operational",
-            "database": "connected",
-            "doctors": doctor_count,
-            "appointments": appointment_count,
-            "mcp_server": "running" if MCP_AVAILABLE else "not_available",
-            "agents": {
-                "appointment_agent": "active" if MCP_AVAILABLE else "basic",
-                "voice_agent": "active",
-                "gmail_agent": "active" if MCP_AVAILABLE else "simulated",
-                "whatsapp_agent": "active" if MCP_AVAILABLE else "simulated",
-                "alerts_agent": "active"
-            },
-            "timestamp": datetime.now().isoformat()
-        })
+        body = app.json.dumps(_build_status()).encode()
+        with _status_cache_lock:
+            _status_cache['status'] = body
+        return _status_response(body)
         
     except Exception as e:
         logger.error(f"System status error: {str(e)}")
@@ -146,10 +323,12 @@ def system_status():
             "timestamp": datetime.now().isoformat()
         }), 500
 
-@app.route('/api/features')
-def get_features():
-    """Get list of available features"""
-    return jsonify({
+# /api/features content never changes at runtime: serialize it once and serve with an ETag
+@functools.lru_cache(maxsize=1)
+def _features_payload():
+    """Serialized features body and its ETag"""
+    mcp_available = _mcp_available()
+    body = app.json.dumps({
         "features": {
             "voice_interaction": {
                 "name": "Voice Interaction",
@@ -160,7 +339,7 @@ def get_features():
             "smart_scheduling": {
                 "name": "Smart Scheduling",
                 "description": "AI-powered appointment recommendations and conflict resolution",
-                "status": "active" if MCP_AVAILABLE else "basic",
+                "status": "active" if mcp_available else "basic",
                 "endpoint": "/api/appointments/smart_recommendations"
             },
             "dynamic_alerts": {
@@ -172,7 +351,7 @@ def get_features():
             "multi_channel_communication": {
                 "name": "Multi-Channel Communication",
                 "description": "Email, WhatsApp, and voice notifications",
-                "status": "active" if MCP_AVAILABLE else "simulated",
+                "status": "active" if mcp_available else "simulated",
                 "endpoints": ["/api/notifications/email", "/api/notifications/whatsapp"]
             },
             "user_dashboard": {
@@ -190,10 +369,25 @@ def get_features():
             "mcp_integration": {
                 "name": "MCP Multi-Agent Architecture",
                 "description": "Model Context Protocol for seamless agent communication",
-                "status": "active" if MCP_AVAILABLE else "not_available"
+                "status": "active" if mcp_available else "not_available"
             }
         }
-    })
+    }).encode()
+    return body, hashlib.blake2b(body, digest_size=8).hexdigest()
+
+@app.route('/api/features')
+def get_features():
+    """Get list of available features"""
+    body, etag = _features_payload()
+    # Flask-Compress suffixes the ETag with the encoding (":gzip", ":br"), so compare the base tag
+    if any(tag.split(':', 1)[0] == etag for tag in request.if_none_match.as_set()):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response
 
 @app.route('/api/demo/schedule', methods=['POST'])
 def demo_schedule():
@@ -229,32 +423,29 @@ def demo_schedule():
         
         # Store in database if available
         try:
-            db_path = os.path.join(os.path.dirname(__file__), 'database', 'hospital_scheduler.db')
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO appointments 
-                (appointment_id, patient_name, patient_phone, patient_email, 
-                 doctor_name, department, appointment_date, appointment_time, 
-                 notes, status, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                appointment_data['appointment_id'],
-                appointment_data['patient_name'],
-                appointment_data['patient_phone'],
-                appointment_data['patient_email'],
-                appointment_data['doctor_name'],
-                appointment_data['department'],
-                appointment_data['appointment_date'],
-                appointment_data['appointment_time'],
-                data.get('notes', ''),
-                appointment_data['status'],
-                appointment_data['created_at']
-            ))
+            conn = _get_conn()
+            with conn:
+                conn.execute("""
+                    INSERT INTO appointments 
+                    (appointment_id, patient_name, patient_phone, patient_email, 
+                     doctor_name, department, appointment_date, appointment_time, 
+                     notes, status, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    appointment_data['appointment_id'],
+                    appointment_data['patient_name'],
+                    appointment_data['patient_phone'],
+                    appointment_data['patient_email'],
+                    appointment_data['doctor_name'],
+                    appointment_data['department'],
+                    appointment_data['appointment_date'],
+                    appointment_data['appointment_time'],
+                    data.get('notes', ''),
+                    appointment_data['status'],
+                    appointment_data['created_at']
+                ))
             
-            conn.commit()
-            conn.close()
+            _publish_status()
             
         except Exception as e:
             logger.warning(f"Could not store in database: {str(e)}")
@@ -280,10 +471,14 @@ def init_database():
         db_dir = os.path.join(os.path.dirname(__file__), 'database')
         os.makedirs(db_dir, exist_ok=True)
         
-        db_path = os.path.join(db_dir, 'hospital_scheduler.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
+        # Seed in one transaction with relaxed durability; restored below
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("BEGIN IMMEDIATE")
+        
         # Create tables if they don't exist
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS doctors (
@@ -331,6 +526,31 @@ def init_database():
             )
         """)
         
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY,
+                type TEXT,
+                appointment_id TEXT,
+                appointment_json TEXT,
+                result_json TEXT,
+                created_at TEXT
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                n INTEGER NOT NULL
+            )
+        """)
+        
+        # Indexes for the dashboard lookups by patient, doctor, date and status
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_appt_phone_date ON appointments(patient_phone, appointment_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_appt_doctor_date ON appointments(doctor_name, appointment_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_appt_status ON appointments(status) WHERE status != 'completed'")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerts_appointment ON alerts(appointment_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerts_status_created ON alerts(status, created_at)")
+        
         # Check if sample data exists
         cursor.execute("SELECT COUNT(*) FROM doctors")
         if cursor.fetchone()[0] == 0:
@@ -353,7 +573,26 @@ def init_database():
             
             logger.info("Sample doctors inserted into database")
         
+        # Resync the status counters from the current row counts, then let
+        # triggers keep them current for every writer of these tables
+        for table in ('doctors', 'appointments'):
+            cursor.execute(f"INSERT OR REPLACE INTO counters (name, n) SELECT '{table}', COUNT(*) FROM {table}")
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table}
+                BEGIN
+                    UPDATE counters SET n = n + 1 WHERE name = '{table}';
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table}
+                BEGIN
+                    UPDATE counters SET n = n - 1 WHERE name = '{table}';
+                END
+            """)
+        
         conn.commit()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
         conn.close()
         logger.info("Database initialized successfully")
         
@@ -369,14 +608,21 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
+    release_user_connection(request.sid)
     logger.info("Client disconnected from SocketIO")
 
+@socketio.on('subscribe_status', namespace='/status')
+def handle_subscribe_status():
+    """Send the current status snapshot; later changes are pushed by _publish_status"""
+    _start_status_watcher()
+    emit('system_status', _build_status())
+
 if __name__ == '__main__':
-    # Initialize database
-    init_database()
+    # The database is initialized by ensure_db on first access
     
     # Initialize MCP agent (async) if available
-    if MCP_AVAILABLE:
+    get_hospital_agent = _get_agent_factory()
+    if get_hospital_agent is not None:
         async def init_agent():
             try:
                 agent = await get_hospital_agent()
@@ -397,7 +643,7 @@ if __name__ == '__main__':
     print("\n" + "="*60)
     print("🏥 HOSPITAL APPOINTMENT SCHEDULER")
     print("="*60)
-    print("🤖 Multi-Agent Architecture:", "MCP Enabled" if MCP_AVAILABLE else "Basic Mode")
+    print("🤖 Multi-Agent Architecture:", "MCP Enabled" if get_hospital_agent is not None else "Basic Mode")
     print("🎤 Voice Interaction: Enabled")
     print("📱 Real-time Dashboards: Active")
     print("📧 Communication: Email & WhatsApp Integration")
@@ -410,6 +656,6 @@ if __name__ == '__main__':
     print("Ready for AI Agents Hackathon! 🚀")
     print("="*60 + "\n")
     
-    # Run the app with SocketIO
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
+    # Run the app with SocketIO (the Werkzeug debugger is never enabled under PROD=1)
+    socketio.run(app, host='0.0.0.0', port=5000, debug=DEBUG and not PRODUCTION, allow_unsafe_werkzeug=True)
 
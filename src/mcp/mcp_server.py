@@ -2,12 +2,16 @@
 Model Context Protocol (MCP) Server Implementation
 Provides the communication backbone for multi-agent hospital appointment system
 """
-import json
-import uuid
+import os
+import re
+import secrets
 import asyncio
-from typing import Dict, Any, List, Optional, Callable
+import orjson
+from typing import Dict, Any, Iterator, List, Optional, Callable, Tuple, Union
+from collections import deque
+from itertools import chain
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from enum import Enum
 import logging
 
@@ -15,6 +19,13 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Messages kept per conversation; older ones are dropped
+MAX_CONVERSATION_HISTORY = int(os.getenv('MCP_MAX_HISTORY', '1000'))
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool result or resource to a JSON string"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
 class MCPMessageType(Enum):
     """MCP message types following JSON-RPC 2.0 specification"""
     REQUEST = "request"
@@ -28,7 +39,7 @@ class MCPResourceType(Enum):
     PROMPT = "prompt"
     RESOURCE = "resource"
 
-@dataclass
+@dataclass(slots=True)
 class MCPMessage:
     """Standard MCP message structure"""
     jsonrpc: str = "2.0"
@@ -39,10 +50,54 @@ class MCPMessage:
     error: Optional[Dict[str, Any]] = None
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
-        return {k: v for k, v in asdict(self).items() if v is not None}
+        """Convert to dictionary for JSON serialization, leaving out unset fields"""
+        # Built by hand: asdict() deep-copies every field and this runs for every response
+        d = {"jsonrpc": self.jsonrpc}
+        if self.id is not None:
+            d["id"] = self.id
+        if self.method is not None:
+            d["method"] = self.method
+        if self.params is not None:
+            d["params"] = self.params
+        if self.result is not None:
+            d["result"] = self.result
+        if self.error is not None:
+            d["error"] = self.error
+        return d
+
+def _msg_from_dict(message: Dict[str, Any]) -> MCPMessage:
+    """Build an MCPMessage from a decoded envelope, ignoring unknown keys"""
+    return MCPMessage(
+        message.get("jsonrpc", "2.0"),
+        message.get("id"),
+        message.get("method"),
+        message.get("params"),
+        message.get("result"),
+        message.get("error")
+    )
+
+def _error_response(message_id: Any, code: int, text: str) -> Dict[str, Any]:
+    """JSON-RPC error envelope, built directly as a dict"""
+    response: Dict[str, Any] = {"jsonrpc": "2.0"}
+    if message_id is not None:
+        response["id"] = message_id
+    response["error"] = {"code": code, "message": text}
+    return response
 
-@dataclass
+def _method_not_found(message: Dict[str, Any]) -> Dict[str, Any]:
+    """-32601 response for an envelope"""
+    return _error_response(message.get("id"), -32601, f"Method not found: {message.get('method')}")
+
+_PLACEHOLDER = re.compile(r"\{([^{}]*)\}")
+
+def _render_template(template: str, arguments: Dict[str, Any]) -> str:
+    """Substitute {name} placeholders in one pass; placeholders without an argument are left as-is"""
+    if not arguments:
+        return template
+    values = {key: str(value) for key, value in arguments.items()}
+    return _PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), template)
+
+@dataclass(slots=True)
 class MCPTool:
     """MCP tool definition"""
     name: str
@@ -50,7 +105,7 @@ class MCPTool:
     input_schema: Dict[str, Any]
     handler: Callable
 
-@dataclass
+@dataclass(slots=True)
 class MCPResource:
     """MCP resource definition"""
     uri: str
@@ -59,7 +114,7 @@ class MCPResource:
     mime_type: str
     content: Any
 
-@dataclass
+@dataclass(slots=True)
 class MCPPrompt:
     """MCP prompt definition"""
     name: str
@@ -70,6 +125,11 @@ class MCPPrompt:
 class MCPAgent:
     """Base class for MCP agents"""
     
+    __slots__ = (
+        "agent_id", "name", "description", "tools", "resources", "prompts", "context",
+        "_on_change", "_entries"
+    )
+    
     def __init__(self, agent_id: str, name: str, description: str):
         self.agent_id = agent_id
         self.name = name
@@ -78,20 +138,64 @@ class MCPAgent:
         self.resources: Dict[str, MCPResource] = {}
         self.prompts: Dict[str, MCPPrompt] = {}
         self.context: Dict[str, Any] = {}
+        # Set by MCPServer.register_agent so registrations invalidate its cached listings
+        self._on_change: Optional[Callable[[str], None]] = None
+        # This agent's list_* entries, rebuilt only after one of its own registrations
+        self._entries: Dict[str, Tuple[Dict[str, Any], ...]] = {}
+        
+    def _changed(self, kind: str):
+        """Drop cached entries and tell the owning server a tool, resource or prompt was registered"""
+        self._entries.pop(kind, None)
+        if self._on_change is not None:
+            self._on_change(kind)
+        
+    def listing_entries(self, kind: str) -> Tuple[Dict[str, Any], ...]:
+        """Entries this agent contributes to list_tools/list_resources/list_prompts"""
+        entries = self._entries.get(kind)
+        if entries is None:
+            entries = self._entries[kind] = tuple(self._build_entries(kind))
+        return entries
+        
+    def _build_entries(self, kind: str) -> Iterator[Dict[str, Any]]:
+        if kind == "tools":
+            for tool_name, tool in self.tools.items():
+                yield {
+                    "name": f"{self.agent_id}.{tool_name}",
+                    "description": tool.description,
+                    "inputSchema": tool.input_schema
+                }
+        elif kind == "resources":
+            for resource in self.resources.values():
+                yield {
+                    "uri": resource.uri,
+                    "name": resource.name,
+                    "description": resource.description,
+                    "mimeType": resource.mime_type
+                }
+        else:
+            for prompt_name, prompt in self.prompts.items():
+                yield {
+                    "name": f"{self.agent_id}.{prompt_name}",
+                    "description": prompt.description,
+                    "arguments": prompt.arguments
+                }
         
     def register_tool(self, tool: MCPTool):
         """Register a tool with this agent"""
         self.tools[tool.name] = tool
+        self._changed("tools")
         logger.info(f"Agent {self.agent_id} registered tool: {tool.name}")
         
     def register_resource(self, resource: MCPResource):
         """Register a resource with this agent"""
         self.resources[resource.uri] = resource
+        self._changed("resources")
         logger.info(f"Agent {self.agent_id} registered resource: {resource.uri}")
         
     def register_prompt(self, prompt: MCPPrompt):
         """Register a prompt with this agent"""
         self.prompts[prompt.name] = prompt
+        self._changed("prompts")
         logger.info(f"Agent {self.agent_id} registered prompt: {prompt.name}")
         
     async def handle_tool_call(self, tool_name: str, params: Dict[str, Any]) -> Any:
@@ -99,13 +203,16 @@ class MCPAgent:
         if tool_name not in self.tools:
             raise ValueError(f"Tool {tool_name} not found in agent {self.agent_id}")
         
-        tool = self.tools[tool_name]
+        return await self._run_tool(self.tools[tool_name], params)
+    
+    async def _run_tool(self, tool: MCPTool, params: Dict[str, Any]) -> Any:
+        """Invoke an already resolved tool"""
         try:
             result = await tool.handler(**params)
-            logger.info(f"Tool {tool_name} executed successfully by agent {self.agent_id}")
+            logger.info(f"Tool {tool.name} executed successfully by agent {self.agent_id}")
             return result
         except Exception as e:
-            logger.error(f"Error executing tool {tool_name} in agent {self.agent_id}: {str(e)}")
+            logger.error(f"Error executing tool {tool.name} in agent {self.agent_id}: {str(e)}")
             raise
 
 class MCPServer:
@@ -115,6 +222,12 @@ class MCPServer:
         self.agents: Dict[str, MCPAgent] = {}
         self.conversations: Dict[str, Dict[str, Any]] = {}
         self.message_handlers: Dict[str, Callable] = {}
+        # list_tools/list_resources/list_prompts results, rebuilt after a registration
+        self._listings: Dict[str, Tuple[Dict[str, Any], ...]] = {}
+        # "agent_id.tool_name" -> (agent, tool), rebuilt after a registration
+        self._tool_index: Optional[Dict[str, Tuple[MCPAgent, MCPTool]]] = None
+        # uri -> resource across all agents (first registered agent wins), rebuilt likewise
+        self._resource_index: Optional[Dict[str, MCPResource]] = None
         self.setup_core_handlers()
         
     def setup_core_handlers(self):
@@ -136,42 +249,82 @@ class MCPServer:
     def register_agent(self, agent: MCPAgent):
         """Register an agent with the MCP server"""
         self.agents[agent.agent_id] = agent
+        agent._on_change = self._invalidate_listing
+        self._listings.clear()
+        self._tool_index = None
+        self._resource_index = None
         logger.info(f"Registered agent: {agent.agent_id} ({agent.name})")
         
-    async def handle_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle incoming MCP message"""
+    def _invalidate_listing(self, kind: str):
+        """Drop what is cached for kind ("tools", "resources" or "prompts")"""
+        self._listings.pop(kind, None)
+        if kind == "tools":
+            self._tool_index = None
+        elif kind == "resources":
+            self._resource_index = None
+        
+    def _lookup_tool(self, name: str) -> Optional[Tuple[MCPAgent, MCPTool]]:
+        """Resolve a dotted tool name to its agent and tool"""
+        index = self._tool_index
+        if index is None:
+            index = self._tool_index = {
+                f"{agent.agent_id}.{tool_name}": (agent, tool)
+                for agent in self.agents.values()
+                for tool_name, tool in agent.tools.items()
+            }
+        return index.get(name)
+        
+    def _lookup_resource(self, uri: str) -> Optional[MCPResource]:
+        """Find a resource by URI across all agents"""
+        index = self._resource_index
+        if index is None:
+            index = self._resource_index = {}
+            for agent in self.agents.values():
+                for resource_uri, resource in agent.resources.items():
+                    index.setdefault(resource_uri, resource)
+        return index.get(uri)
+        
+    async def handle_message(
+        self, message: Union[Dict[str, Any], List[Dict[str, Any]], bytes, str]
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Handle incoming MCP message or JSON-RPC batch (already decoded, or raw JSON from the transport)"""
+        if not isinstance(message, (dict, list)):
+            try:
+                message = orjson.loads(message)
+            except orjson.JSONDecodeError as e:
+                return _error_response(None, -32700, f"Parse error: {e}")
+        
+        if isinstance(message, list):
+            if not message:
+                return _error_response(None, -32600, "Invalid Request: empty batch")
+            # Batch entries are independent, so run them concurrently
+            return list(await asyncio.gather(*(self._handle_one(m) for m in message)))
+        
+        return await self._handle_one(message)
+    
+    async def _handle_one(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch a single JSON-RPC envelope to its handler"""
+        if not isinstance(message, dict):
+            return _error_response(None, -32600, "Invalid Request")
+        
         try:
-            mcp_message = MCPMessage(**message)
+            # Reject unknown methods before building any MCPMessage
+            handler = self.message_handlers.get(message.get("method"))
+            if handler is None:
+                return _method_not_found(message)
             
-            if mcp_message.method in self.message_handlers:
-                handler = self.message_handlers[mcp_message.method]
-                result = await handler(mcp_message.params or {})
-                
-                response = MCPMessage(
-                    id=mcp_message.id,
-                    result=result
-                )
-                return response.to_dict()
-            else:
-                error_response = MCPMessage(
-                    id=mcp_message.id,
-                    error={
-                        "code": -32601,
-                        "message": f"Method not found: {mcp_message.method}"
-                    }
-                )
-                return error_response.to_dict()
+            mcp_message = _msg_from_dict(message)
+            result = await handler(mcp_message.params or {})
+            
+            response = MCPMessage(
+                id=mcp_message.id,
+                result=result
+            )
+            return response.to_dict()
                 
         except Exception as e:
             logger.error(f"Error handling MCP message: {str(e)}")
-            error_response = MCPMessage(
-                id=message.get("id"),
-                error={
-                    "code": -32603,
-                    "message": f"Internal error: {str(e)}"
-                }
-            )
-            return error_response.to_dict()
+            return _error_response(message.get("id"), -32603, f"Internal error: {str(e)}")
     
     async def handle_initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Handle MCP initialization"""
@@ -189,45 +342,27 @@ class MCPServer:
             }
         }
     
+    def _listing(self, kind: str) -> Dict[str, Any]:
+        """{kind: [...]} listing, chained from each agent's cached entries"""
+        entries = self._listings.get(kind)
+        if entries is None:
+            entries = self._listings[kind] = tuple(
+                chain.from_iterable(agent.listing_entries(kind) for agent in self.agents.values())
+            )
+        # Fresh envelope and list per response, so callers can't alter the cache
+        return {kind: list(entries)}
+    
     async def handle_list_tools(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """List all available tools across agents"""
-        tools = []
-        for agent in self.agents.values():
-            for tool_name, tool in agent.tools.items():
-                tools.append({
-                    "name": f"{agent.agent_id}.{tool_name}",
-                    "description": tool.description,
-                    "inputSchema": tool.input_schema
-                })
-        
-        return {"tools": tools}
+        return self._listing("tools")
     
     async def handle_list_resources(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """List all available resources across agents"""
-        resources = []
-        for agent in self.agents.values():
-            for resource_uri, resource in agent.resources.items():
-                resources.append({
-                    "uri": resource.uri,
-                    "name": resource.name,
-                    "description": resource.description,
-                    "mimeType": resource.mime_type
-                })
-        
-        return {"resources": resources}
+        return self._listing("resources")
     
     async def handle_list_prompts(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """List all available prompts across agents"""
-        prompts = []
-        for agent in self.agents.values():
-            for prompt_name, prompt in agent.prompts.items():
-                prompts.append({
-                    "name": f"{agent.agent_id}.{prompt_name}",
-                    "description": prompt.description,
-                    "arguments": prompt.arguments
-                })
-        
-        return {"prompts": prompts}
+        return self._listing("prompts")
     
     async def handle_call_tool(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Handle tool invocation"""
@@ -237,23 +372,28 @@ class MCPServer:
         if not tool_name:
             raise ValueError("Tool name is required")
         
-        # Parse agent_id and tool_name
-        if "." in tool_name:
-            agent_id, actual_tool_name = tool_name.split(".", 1)
+        entry = self._lookup_tool(tool_name)
+        if entry is not None:
+            agent, tool = entry
+            result = await agent._run_tool(tool, arguments)
         else:
-            raise ValueError("Tool name must be in format 'agent_id.tool_name'")
-        
-        if agent_id not in self.agents:
-            raise ValueError(f"Agent {agent_id} not found")
-        
-        agent = self.agents[agent_id]
-        result = await agent.handle_tool_call(actual_tool_name, arguments)
+            # Not registered: parse the name only to report what is wrong with it
+            if "." in tool_name:
+                agent_id, actual_tool_name = tool_name.split(".", 1)
+            else:
+                raise ValueError("Tool name must be in format 'agent_id.tool_name'")
+            
+            if agent_id not in self.agents:
+                raise ValueError(f"Agent {agent_id} not found")
+            
+            agent = self.agents[agent_id]
+            result = await agent.handle_tool_call(actual_tool_name, arguments)
         
         return {
             "content": [
                 {
                     "type": "text",
-                    "text": json.dumps(result) if not isinstance(result, str) else result
+                    "text": _dumps(result) if not isinstance(result, str) else result
                 }
             ]
         }
@@ -265,20 +405,19 @@ class MCPServer:
         if not uri:
             raise ValueError("Resource URI is required")
         
-        for agent in self.agents.values():
-            if uri in agent.resources:
-                resource = agent.resources[uri]
-                return {
-                    "contents": [
-                        {
-                            "uri": resource.uri,
-                            "mimeType": resource.mime_type,
-                            "text": resource.content if isinstance(resource.content, str) else json.dumps(resource.content)
-                        }
-                    ]
-                }
+        resource = self._lookup_resource(uri)
+        if resource is None:
+            raise ValueError(f"Resource {uri} not found")
         
-        raise ValueError(f"Resource {uri} not found")
+        return {
+            "contents": [
+                {
+                    "uri": resource.uri,
+                    "mimeType": resource.mime_type,
+                    "text": resource.content if isinstance(resource.content, str) else _dumps(resource.content)
+                }
+            ]
+        }
     
     async def handle_get_prompt(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Get prompt template"""
@@ -303,10 +442,7 @@ class MCPServer:
         
         prompt = agent.prompts[actual_prompt_name]
         
-        # Simple template substitution
-        template = prompt.template
-        for key, value in arguments.items():
-            template = template.replace(f"{{{key}}}", str(value))
+        template = _render_template(prompt.template, arguments)
         
         return {
             "description": prompt.description,
@@ -340,31 +476,36 @@ class MCPServer:
         from_agent = params.get("from_agent")
         to_agent = params.get("to_agent")
         message = params.get("message")
-        conversation_id = params.get("conversation_id", str(uuid.uuid4()))
+        conversation_id = params["conversation_id"] if "conversation_id" in params else secrets.token_hex(16)
         
         if not all([from_agent, to_agent, message]):
             raise ValueError("from_agent, to_agent, and message are required")
         
+        now = datetime.now().isoformat()
+        
         # Store message in conversation history
         if conversation_id not in self.conversations:
             self.conversations[conversation_id] = {
                 "id": conversation_id,
                 "participants": [from_agent, to_agent],
-                "messages": [],
-                "created_at": datetime.now().isoformat()
+                "messages": deque(maxlen=MAX_CONVERSATION_HISTORY),
+                "message_count": 0,
+                "created_at": now
             }
         
-        self.conversations[conversation_id]["messages"].append({
+        conversation = self.conversations[conversation_id]
+        conversation["messages"].append({
             "from": from_agent,
             "to": to_agent,
             "message": message,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now
         })
+        conversation["message_count"] = conversation.get("message_count", 0) + 1
         
         return {
             "status": "sent",
             "conversation_id": conversation_id,
-            "message_id": str(uuid.uuid4())
+            "message_id": secrets.token_hex(16)
         }
     
     async def handle_get_context(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -377,7 +518,8 @@ class MCPServer:
         if conversation_id not in self.conversations:
             return {"context": None}
         
-        return {"context": self.conversations[conversation_id]}
+        conversation = self.conversations[conversation_id]
+        return {"context": {**conversation, "messages": list(conversation["messages"])}}
     
     async def handle_update_context(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Update conversation context"""
@@ -387,17 +529,20 @@ class MCPServer:
         if not conversation_id:
             raise ValueError("conversation_id is required")
         
+        now = datetime.now().isoformat()
+        
         if conversation_id not in self.conversations:
             self.conversations[conversation_id] = {
                 "id": conversation_id,
                 "participants": [],
-                "messages": [],
-                "created_at": datetime.now().isoformat()
+                "messages": deque(maxlen=MAX_CONVERSATION_HISTORY),
+                "message_count": 0,
+                "created_at": now
             }
         
         # Update context with new information
         self.conversations[conversation_id].update(context_update)
-        self.conversations[conversation_id]["updated_at"] = datetime.now().isoformat()
+        self.conversations[conversation_id]["updated_at"] = now
         
         return {"status": "updated", "conversation_id": conversation_id}
 
@@ -3,9 +3,15 @@ Proper MCP Server Implementation using Official MCP Python SDK
 Hospital Appointment Scheduler with Multi-Agent Architecture
 """
 import os
-import json
+import time
 import asyncio
-from typing import Dict, Any, List, Optional, Sequence
+import functools
+import itertools
+import operator
+import threading
+import orjson
+from cachetools import TTLCache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 import logging
 from mcp.server.fastmcp import FastMCP
@@ -18,18 +24,46 @@ from contextlib import asynccontextmanager
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _dumps(obj: Any) -> str:
+    """Serialize a tool/resource result to a JSON string"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
 # Create the FastMCP server
 mcp_server = FastMCP("Hospital Appointment Scheduler")
 
 # Database connection
 DATABASE_PATH = os.getenv('DATABASE_PATH', 'hospital_scheduler.db')
 
+# One long-lived connection per thread; tools must not close it
+_db_local = threading.local()
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """Get this thread's database connection, opening it in WAL mode on first use"""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        # Every tool uses fixed SQL strings, so sqlite3's per-connection statement
+        # cache keeps them all compiled for the life of the connection
+        conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        _db_local.conn = conn
     return conn
 
+# Open slots shown per doctor per day in smart recommendations
+TOP_SLOTS_PER_DAY = 3
+
+@functools.lru_cache(maxsize=64)
+def _shift_slots(start_time: str, end_time: str, duration: int) -> Tuple[str, ...]:
+    """HH:MM start of every consultation slot in a shift (shifts repeat, so cache them)"""
+    start = datetime.strptime(start_time, '%H:%M:%S')
+    end = datetime.strptime(end_time, '%H:%M:%S')
+    start_s = start.hour * 3600 + start.minute * 60 + start.second
+    end_s = end.hour * 3600 + end.minute * 60 + end.second
+    return tuple(f"{t // 3600:02d}:{t // 60 % 60:02d}" for t in range(start_s, end_s, duration * 60))
+
 # ============================================================================
 # APPOINTMENT MANAGEMENT TOOLS
 # ============================================================================
@@ -70,42 +104,41 @@ def schedule_appointment(
         doctor = cursor.fetchone()
         
         if not doctor:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Doctor {doctor_name} not found"
             })
         
-        # Check for conflicts
-        cursor.execute("""
-            SELECT id FROM appointments 
-            WHERE doctor_name = ? AND appointment_date = ? AND appointment_time = ?
-        """, (doctor_name, appointment_date, appointment_time))
-        
-        if cursor.fetchone():
-            return json.dumps({
+        # Create appointment; the ID and created_at come from one clock read
+        now_us = time.time_ns() // 1000
+        appointment_id = f"APT_{now_us:x}"
+        
+        # Insert only if the slot is free (conflict check and insert in one statement)
+        with conn:
+            cursor.execute("""
+                INSERT INTO appointments 
+                (appointment_id, patient_name, patient_phone, patient_email, 
+                 doctor_name, department, appointment_date, appointment_time, 
+                 notes, status, created_at)
+                SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, 'scheduled', ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM appointments 
+                    WHERE doctor_name = ? AND appointment_date = ? AND appointment_time = ?
+                )
+            """, (appointment_id, patient_name, patient_phone, patient_email,
+                  doctor_name, department, appointment_date, appointment_time,
+                  notes, datetime.fromtimestamp(now_us / 1e6).isoformat(),
+                  doctor_name, appointment_date, appointment_time))
+        
+        if cursor.rowcount == 0:
+            return _dumps({
                 "success": False,
                 "error": "Time slot already booked"
             })
         
-        # Create appointment
-        appointment_id = f"APT_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        cursor.execute("""
-            INSERT INTO appointments 
-            (appointment_id, patient_name, patient_phone, patient_email, 
-             doctor_name, department, appointment_date, appointment_time, 
-             notes, status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'scheduled', ?)
-        """, (appointment_id, patient_name, patient_phone, patient_email,
-              doctor_name, department, appointment_date, appointment_time,
-              notes, datetime.now().isoformat()))
-        
-        conn.commit()
-        conn.close()
-        
         logger.info(f"Appointment scheduled: {appointment_id}")
         
-        return json.dumps({
+        return _dumps({
             "success": True,
             "appointment_id": appointment_id,
             "patient_name": patient_name,
@@ -118,7 +151,7 @@ def schedule_appointment(
         
     except Exception as e:
         logger.error(f"Error scheduling appointment: {str(e)}")
-        return json.dumps({
+        return _dumps({
             "success": False,
             "error": str(e)
         })
@@ -146,7 +179,7 @@ def get_doctor_availability(doctor_name: str, date: str) -> str:
         doctor = cursor.fetchone()
         
         if not doctor:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Doctor {doctor_name} not found"
             })
@@ -157,26 +190,14 @@ def get_doctor_availability(doctor_name: str, date: str) -> str:
             WHERE doctor_name = ? AND appointment_date = ? AND status != 'cancelled'
         """, (doctor_name, date))
         
-        booked_times = [row[0] for row in cursor.fetchall()]
+        booked_times = {row[0] for row in cursor.fetchall()}
         
         # Generate available slots
-        available_slots = []
-        start_time = datetime.strptime(doctor['start_time'], '%H:%M:%S').time()
-        end_time = datetime.strptime(doctor['end_time'], '%H:%M:%S').time()
         duration = doctor['consultation_duration']
+        slots = _shift_slots(doctor['start_time'], doctor['end_time'], duration)
+        available_slots = [t for t in slots if t not in booked_times] if booked_times else list(slots)
         
-        current_time = datetime.combine(datetime.today(), start_time)
-        end_datetime = datetime.combine(datetime.today(), end_time)
-        
-        while current_time < end_datetime:
-            time_str = current_time.strftime('%H:%M')
-            if time_str not in booked_times:
-                available_slots.append(time_str)
-            current_time += timedelta(minutes=duration)
-        
-        conn.close()
-        
-        return json.dumps({
+        return _dumps({
             "success": True,
             "doctor_name": doctor_name,
             "date": date,
@@ -186,7 +207,7 @@ def get_doctor_availability(doctor_name: str, date: str) -> str:
         
     except Exception as e:
         logger.error(f"Error getting doctor availability: {str(e)}")
-        return json.dumps({
+        return _dumps({
             "success": False,
             "error": str(e)
         })
@@ -225,9 +246,7 @@ def get_patient_appointments(patient_phone: str) -> str:
                 "notes": row['notes']
             })
         
-        conn.close()
-        
-        return json.dumps({
+        return _dumps({
             "success": True,
             "patient_phone": patient_phone,
             "appointments": appointments,
@@ -236,7 +255,7 @@ def get_patient_appointments(patient_phone: str) -> str:
         
     except Exception as e:
         logger.error(f"Error getting patient appointments: {str(e)}")
-        return json.dumps({
+        return _dumps({
             "success": False,
             "error": str(e)
         })
@@ -270,7 +289,7 @@ def send_email_notification(
         
         logger.info(f"Email sent to {recipient_email}: {subject}")
         
-        return json.dumps({
+        return _dumps({
             "success": True,
             "recipient": recipient_email,
             "subject": subject,
@@ -280,7 +299,7 @@ def send_email_notification(
         
     except Exception as e:
         logger.error(f"Error sending email: {str(e)}")
-        return json.dumps({
+        return _dumps({
             "success": False,
             "error": str(e)
         })
@@ -308,7 +327,7 @@ def send_whatsapp_message(
         
         logger.info(f"WhatsApp message sent to {recipient_phone}: {message}")
         
-        return json.dumps({
+        return _dumps({
             "success": True,
             "recipient": recipient_phone,
             "message": "WhatsApp message sent successfully",
@@ -318,7 +337,7 @@ def send_whatsapp_message(
         
     except Exception as e:
         logger.error(f"Error sending WhatsApp message: {str(e)}")
-        return json.dumps({
+        return _dumps({
             "success": False,
             "error": str(e)
         })
@@ -361,30 +380,29 @@ def create_dynamic_alert(
         appointment = cursor.fetchone()
         
         if not appointment:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Appointment {appointment_id} not found"
             })
         
-        # Create alert
-        alert_id = f"ALERT_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        cursor.execute("""
-            INSERT INTO alerts 
-            (alert_id, alert_type, appointment_id, patient_phone, 
-             message, priority, estimated_delay, new_appointment_time, 
-             status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?)
-        """, (alert_id, alert_type, appointment_id, appointment['patient_phone'],
-              message, priority, estimated_delay, new_appointment_time,
-              datetime.now().isoformat()))
-        
-        conn.commit()
-        conn.close()
+        # Create alert; the ID and created_at come from one clock read
+        now_us = time.time_ns() // 1000
+        alert_id = f"ALERT_{now_us:x}"
+        
+        with conn:
+            cursor.execute("""
+                INSERT INTO alerts 
+                (alert_id, alert_type, appointment_id, patient_phone, 
+                 message, priority, estimated_delay, new_appointment_time, 
+                 status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?)
+            """, (alert_id, alert_type, appointment_id, appointment['patient_phone'],
+                  message, priority, estimated_delay, new_appointment_time,
+                  datetime.fromtimestamp(now_us / 1e6).isoformat()))
         
         logger.info(f"Dynamic alert created: {alert_id}")
         
-        return json.dumps({
+        return _dumps({
             "success": True,
             "alert_id": alert_id,
             "alert_type": alert_type,
@@ -394,11 +412,26 @@ def create_dynamic_alert(
         
     except Exception as e:
         logger.error(f"Error creating dynamic alert: {str(e)}")
-        return json.dumps({
+        return _dumps({
             "success": False,
             "error": str(e)
         })
 
+def _alert_query(by_phone: bool, by_priority: bool) -> str:
+    query = "SELECT * FROM alerts WHERE status = 'pending'"
+    if by_phone:
+        query += " AND patient_phone = ?"
+    if by_priority:
+        query += " AND priority = ?"
+    return query + " ORDER BY created_at DESC"
+
+# One fixed SQL string per filter combination, so sqlite's statement cache gets hits
+_ALERT_QUERIES = {
+    (by_phone, by_priority): _alert_query(by_phone, by_priority)
+    for by_phone in (False, True)
+    for by_priority in (False, True)
+}
+
 @mcp_server.tool()
 def get_active_alerts(patient_phone: str = "", priority: str = "") -> str:
     """
@@ -415,18 +448,8 @@ def get_active_alerts(patient_phone: str = "", priority: str = "") -> str:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        query = "SELECT * FROM alerts WHERE status = 'pending'"
-        params = []
-        
-        if patient_phone:
-            query += " AND patient_phone = ?"
-            params.append(patient_phone)
-        
-        if priority:
-            query += " AND priority = ?"
-            params.append(priority)
-        
-        query += " ORDER BY created_at DESC"
+        query = _ALERT_QUERIES[bool(patient_phone), bool(priority)]
+        params = tuple(value for value in (patient_phone, priority) if value)
         
         cursor.execute(query, params)
         
@@ -444,9 +467,7 @@ def get_active_alerts(patient_phone: str = "", priority: str = "") -> str:
                 "created_at": row['created_at']
             })
         
-        conn.close()
-        
-        return json.dumps({
+        return _dumps({
             "success": True,
             "alerts": alerts,
             "count": len(alerts)
@@ -454,7 +475,7 @@ def get_active_alerts(patient_phone: str = "", priority: str = "") -> str:
         
     except Exception as e:
         logger.error(f"Error getting active alerts: {str(e)}")
-        return json.dumps({
+        return _dumps({
             "success": False,
             "error": str(e)
         })
@@ -486,54 +507,69 @@ def get_smart_recommendations(
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Get doctors in department
+        # Next 7 days, computed once for all doctors, with each day's weekday bit
+        now = datetime.now()
+        window = [now + timedelta(days=i) for i in range(7)]
+        check_dates = [day.strftime('%Y-%m-%d') for day in window]
+        day_bits = [1 << day.weekday() for day in window]
+        window_mask = functools.reduce(operator.or_, day_bits)
+        
+        # Get doctors in department who work on at least one day of the window
         cursor.execute("""
-            SELECT * FROM doctors WHERE department = ?
-        """, (department,))
+            SELECT name, specialization, start_time, end_time, consultation_duration, available_days_mask
+            FROM doctors WHERE department = ? AND (available_days_mask & ?) != 0
+        """, (department, window_mask))
         doctors = cursor.fetchall()
         
         if not doctors:
-            return json.dumps({
+            cursor.execute("SELECT 1 FROM doctors WHERE department = ? LIMIT 1", (department,))
+            if cursor.fetchone() is None:
+                error = f"No doctors found in {department} department"
+            else:
+                error = f"No doctors in {department} department work in the next 7 days"
+            return _dumps({
                 "success": False,
-                "error": f"No doctors found in {department} department"
+                "error": error
             })
         
         recommendations = []
         
-        for doctor in doctors:
-            # Get doctor's availability for next 7 days
-            for i in range(7):
-                check_date = (datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d')
-                
-                # Get available slots
-                cursor.execute("""
-                    SELECT appointment_time FROM appointments 
-                    WHERE doctor_name = ? AND appointment_date = ? AND status != 'cancelled'
-                """, (doctor['name'], check_date))
-                
-                booked_times = [row[0] for row in cursor.fetchall()]
-                
-                # Generate available slots
-                start_time = datetime.strptime(doctor['start_time'], '%H:%M:%S').time()
-                end_time = datetime.strptime(doctor['end_time'], '%H:%M:%S').time()
-                duration = doctor['consultation_duration']
-                
-                current_time = datetime.combine(datetime.today(), start_time)
-                end_datetime = datetime.combine(datetime.today(), end_time)
-                
-                available_slots = []
-                while current_time < end_datetime:
-                    time_str = current_time.strftime('%H:%M')
-                    if time_str not in booked_times:
-                        available_slots.append(time_str)
-                    current_time += timedelta(minutes=duration)
+        # Booked times for every doctor in the department over the window,
+        # one summary row per (doctor, date)
+        cursor.execute("""
+            SELECT doctor_name, appointment_date, booked_times FROM slot_availability
+            WHERE doctor_name IN (SELECT name FROM doctors WHERE department = ?)
+              AND appointment_date BETWEEN ? AND ?
+        """, (department, check_dates[0], check_dates[-1]))
+        
+        booked = {
+            (doctor_name, appointment_date): set(booked_times.split(','))
+            for doctor_name, appointment_date, booked_times in cursor.fetchall()
+        }
+        
+        for name, specialization, start_time, end_time, duration, days_mask in doctors:
+            # The doctor's slot template is the same every day
+            slots = _shift_slots(start_time, end_time, duration)
+            
+            # Get doctor's availability for next 7 days, skipping days they don't work
+            for check_date, day_bit in zip(check_dates, day_bits):
+                if not days_mask & day_bit:
+                    continue
+                # Only the first few open slots are shown, so stop scanning once they're found
+                booked_times = booked.get((name, check_date))
+                if booked_times:
+                    available_slots = list(itertools.islice(
+                        (t for t in slots if t not in booked_times), TOP_SLOTS_PER_DAY
+                    ))
+                else:
+                    available_slots = list(slots[:TOP_SLOTS_PER_DAY])
                 
                 if available_slots:
                     recommendations.append({
-                        "doctor_name": doctor['name'],
-                        "specialization": doctor['specialization'],
+                        "doctor_name": name,
+                        "specialization": specialization,
                         "date": check_date,
-                        "available_slots": available_slots[:3],  # Top 3 slots
+                        "available_slots": available_slots,
                         "consultation_duration": duration,
                         "recommendation_score": 0.8  # Placeholder scoring
                     })
@@ -541,9 +577,7 @@ def get_smart_recommendations(
         # Sort by recommendation score
         recommendations.sort(key=lambda x: x['recommendation_score'], reverse=True)
         
-        conn.close()
-        
-        return json.dumps({
+        return _dumps({
             "success": True,
             "department": department,
             "recommendations": recommendations[:5],  # Top 5 recommendations
@@ -552,7 +586,7 @@ def get_smart_recommendations(
         
     except Exception as e:
         logger.error(f"Error getting smart recommendations: {str(e)}")
-        return json.dumps({
+        return _dumps({
             "success": False,
             "error": str(e)
         })
@@ -561,61 +595,98 @@ def get_smart_recommendations(
 # RESOURCES
 # ============================================================================
 
+# Doctor data rarely changes: serve the two doctor-derived resources from a short TTL cache
+_doctors_resource_cache = TTLCache(maxsize=1, ttl=60)
+_departments_resource_cache = TTLCache(maxsize=1, ttl=300)
+_resource_cache_lock = threading.Lock()
+
+def _cached_resource(cache: TTLCache, loader) -> str:
+    """Return the cached resource body, loading it on a miss (load errors are not cached)"""
+    with _resource_cache_lock:
+        body = cache.get('body')
+    if body is None:
+        body = loader()
+        with _resource_cache_lock:
+            cache['body'] = body
+    return body
+
+def invalidate_doctor_cache():
+    """Drop the cached doctor and department resources; call after changing the doctors table"""
+    with _resource_cache_lock:
+        _doctors_resource_cache.clear()
+        _departments_resource_cache.clear()
+
+def _load_doctors_resource() -> str:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT id, name, specialization, department, available_days,
+               start_time, end_time, consultation_duration
+        FROM doctors
+    """)
+    doctors = []
+    
+    # Doctors share a handful of schedules; parse each distinct JSON string once
+    parsed_days = {}
+    
+    for row in cursor.fetchall():
+        raw_days = row['available_days']
+        available_days = parsed_days.get(raw_days)
+        if available_days is None:
+            available_days = parsed_days[raw_days] = orjson.loads(raw_days)
+        doctors.append({
+            "id": row['id'],
+            "name": row['name'],
+            "specialization": row['specialization'],
+            "department": row['department'],
+            "available_days": available_days,
+            "start_time": row['start_time'],
+            "end_time": row['end_time'],
+            "consultation_duration": row['consultation_duration']
+        })
+    
+    return _dumps({
+        "doctors": doctors,
+        "total_count": len(doctors),
+        "last_updated": datetime.now().isoformat()
+    })
+
+def _load_departments_resource() -> str:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT DISTINCT department FROM doctors")
+    departments = [row[0] for row in cursor.fetchall()]
+    
+    return _dumps({
+        "departments": departments,
+        "total_count": len(departments),
+        "last_updated": datetime.now().isoformat()
+    })
+
 @mcp_server.resource("hospital://doctors")
 def get_doctors_resource() -> str:
     """Get list of all doctors and their information."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM doctors")
-        doctors = []
-        
-        for row in cursor.fetchall():
-            doctors.append({
-                "id": row['id'],
-                "name": row['name'],
-                "specialization": row['specialization'],
-                "department": row['department'],
-                "available_days": json.loads(row['available_days']),
-                "start_time": row['start_time'],
-                "end_time": row['end_time'],
-                "consultation_duration": row['consultation_duration']
-            })
-        
-        conn.close()
-        
-        return json.dumps({
-            "doctors": doctors,
-            "total_count": len(doctors),
-            "last_updated": datetime.now().isoformat()
-        })
+        return _cached_resource(_doctors_resource_cache, _load_doctors_resource)
         
     except Exception as e:
         logger.error(f"Error getting doctors resource: {str(e)}")
-        return json.dumps({"error": str(e)})
+        return _dumps({"error": str(e)})
 
 @mcp_server.resource("hospital://departments")
 def get_departments_resource() -> str:
     """Get list of all medical departments."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT DISTINCT department FROM doctors")
-        departments = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return json.dumps({
-            "departments": departments,
-            "total_count": len(departments),
-            "last_updated": datetime.now().isoformat()
-        })
+        return _cached_resource(_departments_resource_cache, _load_departments_resource)
         
     except Exception as e:
         logger.error(f"Error getting departments resource: {str(e)}")
-        return json.dumps({"error": str(e)})
+        return _dumps({"error": str(e)})
+
+# Rows fetched per round trip when listing a day's appointments
+APPOINTMENTS_FETCH_BATCH = 500
 
 @mcp_server.resource("hospital://appointments/{date}")
 def get_appointments_by_date(date: str) -> str:
@@ -625,25 +696,25 @@ def get_appointments_by_date(date: str) -> str:
         cursor = conn.cursor()
         
         cursor.execute("""
-            SELECT * FROM appointments 
+            SELECT appointment_id, patient_name, doctor_name, department, appointment_time, status
+            FROM appointments 
             WHERE appointment_date = ? 
             ORDER BY appointment_time
         """, (date,))
         
+        # Pull rows in chunks so a busy day never holds the raw rows and the dicts at once
         appointments = []
-        for row in cursor.fetchall():
-            appointments.append({
-                "appointment_id": row['appointment_id'],
-                "patient_name": row['patient_name'],
-                "doctor_name": row['doctor_name'],
-                "department": row['department'],
-                "appointment_time": row['appointment_time'],
-                "status": row['status']
-            })
-        
-        conn.close()
-        
-        return json.dumps({
+        while rows := cursor.fetchmany(APPOINTMENTS_FETCH_BATCH):
+            appointments.extend({
+                "appointment_id": appointment_id,
+                "patient_name": patient_name,
+                "doctor_name": doctor_name,
+                "department": department,
+                "appointment_time": appointment_time,
+                "status": status
+            } for appointment_id, patient_name, doctor_name, department, appointment_time, status in rows)
+        
+        return _dumps({
             "date": date,
             "appointments": appointments,
             "total_count": len(appointments),
@@ -652,7 +723,7 @@ def get_appointments_by_date(date: str) -> str:
         
     except Exception as e:
         logger.error(f"Error getting appointments for date {date}: {str(e)}")
-        return json.dumps({"error": str(e)})
+        return _dumps({"error": str(e)})
 
 # ============================================================================
 # PROMPTS
@@ -743,10 +814,83 @@ def dynamic_alert_prompt(
     Adapt the tone and content based on the alert type (doctor late, appointment postponed, emergency, etc.).
     """
 
+# ============================================================================
+# BULK LOADING
+# ============================================================================
+
+# Rows handed to executemany per call; all batches share one transaction
+BULK_INSERT_BATCH = 500
+
+def _bulk_insert(sql: str, rows) -> int:
+    """Insert rows with executemany in a single transaction; returns the row count"""
+    conn = get_db_connection()
+    rows = iter(rows)
+    count = 0
+    with conn:
+        while batch := list(itertools.islice(rows, BULK_INSERT_BATCH)):
+            conn.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+def bulk_insert_doctors(rows) -> int:
+    """
+    Load doctors in one transaction.
+    
+    Args:
+        rows: Iterable of (name, specialization, department, available_days,
+              start_time, end_time, consultation_duration) tuples
+    """
+    count = _bulk_insert("""
+        INSERT INTO doctors 
+        (name, specialization, department, available_days, 
+         start_time, end_time, consultation_duration)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    invalidate_doctor_cache()
+    return count
+
+def bulk_insert_appointments(rows) -> int:
+    """
+    Load appointments in one transaction.
+    
+    Args:
+        rows: Iterable of (appointment_id, patient_name, patient_phone, patient_email,
+              doctor_name, department, appointment_date, appointment_time,
+              notes, status, created_at) tuples
+    """
+    return _bulk_insert("""
+        INSERT INTO appointments 
+        (appointment_id, patient_name, patient_phone, patient_email, 
+         doctor_name, department, appointment_date, appointment_time, 
+         notes, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
 # ============================================================================
 # DATABASE INITIALIZATION
 # ============================================================================
 
+_WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# available_days (a JSON list of day names, any case) as a bitmask, Monday = bit 0 ... Sunday = bit 6
+_DAYS_MASK_SQL = " | ".join(
+    f"((instr(lower(available_days), '\"{day.lower()}\"') > 0) << {bit})"
+    for bit, day in enumerate(_WEEKDAYS)
+)
+
+# Rebuilds one (doctor, date) row of slot_availability from appointments;
+# {ref} is NEW or OLD inside the appointments triggers
+_SLOT_REFRESH_SQL = """
+    DELETE FROM slot_availability
+    WHERE doctor_name = {ref}.doctor_name AND appointment_date = {ref}.appointment_date;
+    INSERT INTO slot_availability (doctor_name, appointment_date, booked_times)
+    SELECT doctor_name, appointment_date, group_concat(appointment_time, ',')
+    FROM appointments
+    WHERE doctor_name = {ref}.doctor_name AND appointment_date = {ref}.appointment_date
+      AND status != 'cancelled'
+    GROUP BY doctor_name, appointment_date;
+"""
+
 def initialize_database():
     """Initialize the database with required tables."""
     try:
@@ -800,8 +944,91 @@ def initialize_database():
             )
         """)
         
+        # available_days_mask mirrors available_days so day filters run in SQL;
+        # recomputed on startup (the doctors table is small, and this picks up any
+        # change to the expression) and kept in sync by triggers for rows written elsewhere
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(doctors)")}
+        if 'available_days_mask' not in columns:
+            cursor.execute("ALTER TABLE doctors ADD COLUMN available_days_mask INTEGER")
+        cursor.execute(f"UPDATE doctors SET available_days_mask = {_DAYS_MASK_SQL}")
+        cursor.execute("DROP TRIGGER IF EXISTS trg_doctors_days_mask_insert")
+        cursor.execute("DROP TRIGGER IF EXISTS trg_doctors_days_mask_update")
+        cursor.execute(f"""
+            CREATE TRIGGER trg_doctors_days_mask_insert AFTER INSERT ON doctors
+            BEGIN
+                UPDATE doctors SET available_days_mask = {_DAYS_MASK_SQL} WHERE id = NEW.id;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER trg_doctors_days_mask_update AFTER UPDATE OF available_days ON doctors
+            BEGIN
+                UPDATE doctors SET available_days_mask = {_DAYS_MASK_SQL} WHERE id = NEW.id;
+            END
+        """)
+        
+        # slot_availability holds the booked times per (doctor, date) so
+        # recommendations read one row per day instead of every appointment;
+        # backfilled when first created and maintained by triggers on appointments
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'slot_availability'"
+        )
+        if cursor.fetchone() is None:
+            cursor.execute("""
+                CREATE TABLE slot_availability (
+                    doctor_name TEXT NOT NULL,
+                    appointment_date TEXT NOT NULL,
+                    booked_times TEXT NOT NULL,
+                    PRIMARY KEY (doctor_name, appointment_date)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("""
+                INSERT INTO slot_availability (doctor_name, appointment_date, booked_times)
+                SELECT doctor_name, appointment_date, group_concat(appointment_time, ',')
+                FROM appointments WHERE status != 'cancelled'
+                GROUP BY doctor_name, appointment_date
+            """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_slot_availability_insert AFTER INSERT ON appointments
+            BEGIN
+                {_SLOT_REFRESH_SQL.format(ref='NEW')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_slot_availability_update
+            AFTER UPDATE OF doctor_name, appointment_date, appointment_time, status ON appointments
+            BEGIN
+                {_SLOT_REFRESH_SQL.format(ref='OLD')}
+                {_SLOT_REFRESH_SQL.format(ref='NEW')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_slot_availability_delete AFTER DELETE ON appointments
+            BEGIN
+                {_SLOT_REFRESH_SQL.format(ref='OLD')}
+            END
+        """)
+        
+        # Indexes for the tool lookups: slot conflicts/availability, patient
+        # and per-date listings, doctors by department, and pending alerts
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_appt_doctor_day
+            ON appointments(doctor_name, appointment_date, appointment_time)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_appt_patient
+            ON appointments(patient_phone, appointment_date, appointment_time)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_appt_date
+            ON appointments(appointment_date, appointment_time)
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_doctors_dept ON doctors(department)")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_alerts_pending
+            ON alerts(status, patient_phone, priority, created_at DESC)
+        """)
+        
         conn.commit()
-        conn.close()
         
         logger.info("Database initialized successfully")
         